@@ -8,13 +8,45 @@ from dotenv import load_dotenv
 import gspread
 from google.oauth2.service_account import Credentials
 import time
+import sys
+from collections import Counter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import ElementNotInteractableException
+from oddsportal_page_crawler import (DomainRateLimiter, accept_cookies_oddsportal,
+                                     results_page_url, count_result_pages,
+                                     parse_game_row_links, scroll_until_stable,
+                                     load_results_page, crawl_result_pages)
+
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from browser_profile import create_driver
+from scrape_metrics import metrics_from_env, TimedStore
+from season_config import (selected_seasons, selected_competitions, oddsportal_links,
+                           season_slug, season_row, oddsportal_season_col)
+
+
+# === Helper: buffer ids that are not tracked yet (set lookup, O(1) per id) ===
+def buffer_new_ids(odds_ids, comp, season, existing_ids, pending_rows):
+    # Check for duplicate IDs on the page
+    unique_check = len(odds_ids) == len(set(odds_ids))
+    print(f'All match ids are unique: {unique_check}')
+
+    new_on_page = 0
+    for odds_id in odds_ids:
+        key = (odds_id, comp)
+        if key not in existing_ids:
+            existing_ids.add(key)
+            pending_rows.append(season_row([odds_id, comp], oddsportal_season_col, season))
+            new_on_page = new_on_page + 1
+
+    if not new_on_page:
+        print('All collected match ids are already getting tracked!')
+    return new_on_page
 
 # === Connecting to our scraping match id status database ===
 
@@ -38,17 +70,34 @@ gc = gspread.authorize(creds)
 # Open target spreadsheet and worksheet
 sh = gc.open_by_key(sheet_id)
 ws = sh.get_worksheet(2)
+
+# Live telemetry (METRICS_PORT in .env); sheet calls are timed
+metrics = metrics_from_env("oddsportal_collector")
+ws = TimedStore(ws, metrics)
 print("Success! Connected to:", sh.title)
 print("First row:", ws.row_values(1))
 
 # Overwrite header row with column labels
 ws.update([["odds_id", "competition"]], "A1:B1")
+ws.update([["season"]], "J1")
+
+# Read the sheet ONCE and build a set-based index of (odds_id, competition)
+sheet = ws.get_all_values()
+existing_ids = set()
+for row in sheet[1:]:  # skip header
+    if len(row) >= 2:
+        existing_ids.add((row[0], row[1].strip()))
+
+# Rows discovered across all competitions and pages, appended in one bulk write
+pending_rows = []
 
 # === Collecting match id's ===
 
 # Setup Chrome WebDriver
 service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
+# Browser profile: "full" (visible, loads everything) or "lean" (headless, blocks unneeded resources)
+browser_profile = os.getenv("BROWSER_PROFILE", "full")
+driver = create_driver(service, browser_profile)
 
 # Base URL for oddsportal
 url = 'https://www.oddsportal.com'
@@ -57,128 +106,144 @@ url = 'https://www.oddsportal.com'
 driver.get(url)
 time.sleep(5)
 
-# Setup wait object for expected_conditions
-wait = WebDriverWait(driver, 10)
-
-# Wait for OddsPortal cookie banner (OneTrust) to appear
-wait.until(EC.presence_of_element_located((By.ID, "onetrust-consent-sdk")))
-
-# Wait until cookie button is clickable and accept it
-accept_btn = wait.until(
-    EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
-)
-accept_btn.click()
-
-# List of competitions with display names and URL fragments
-comps = ['Premier League', 'Bundesliga', 'Primera División', 'Ligue 1', 
-         'Serie A', 'UEFA Champions League', 'UEFA Europa League']
-
-# URL fragments for each competition
-comps_links = ['/football/england/premier-league',
-               '/football/germany/bundesliga',
-               '/football/spain/laliga',
-               '/football/france/ligue-1',
-               '/football/italy/serie-a',
-               '/football/europe/champions-league',
-               '/football/europe/europa-league']
-
-# ===== Loop over each competition =====
-for comp in comps_links:
-
-    # Load page 1 of results for the competition
-    driver.get(f'{url}{comp}-2024-2025/results/')
-    time.sleep(5)
-
-    # Pagination button selector used by OddsPortal
-    selector = 'a.pagination-link'
-
-    # Determine total number of <a.pagination-link> elements
-    # Assumes last element on first page is "Next"
-    pages = driver.find_elements(By.CSS_SELECTOR, selector)
-    n_pages = len(pages) - 1   # number of numeric pages
-    print(f'The number of pages needed for this competition is {n_pages}')
-
-    # Loop through all pages (1 = first page)
-    for page in range(1, n_pages + 1):
-
-        # === FIRST PAGE (no URL modification needed) ===
-        if page == 1:
-            print('No link construction needed for this page')
-            # Trigger lazy-loading by forcing scroll to bottom
-            driver.execute_script("window.scrollTo(0,999999);")
-            time.sleep(2)
-
-        # === SUBSEQUENT PAGES: construct URL + reload ===
-        else:
-            # Build fragment URL for the page: /#/page/{page}/
-            page_url = f'{url}{comp}-2024-2025/results/#/page/{page}/'
-
-            # Load URL (hash navigation)
-            driver.get(page_url)
-            time.sleep(0.2)
+# Wait for OddsPortal cookie banner (OneTrust) and accept it
+accept_cookies_oddsportal(driver)
+
+# Competitions (display names and URL fragments) and seasons, see season_config
+comps = selected_competitions()
+comps_links = [oddsportal_links[comp] for comp in comps]
+seasons = selected_seasons()
+
+# Crawler mode: "sequential" (one page at a time) or "parallel"
+# (page count discovered once per competition, pages fetched by several browsers)
+crawler_mode = os.getenv("CRAWLER_MODE", "sequential")
+n_workers = int(os.getenv("CRAWLER_WORKERS", "3"))
+min_interval = float(os.getenv("CRAWLER_MIN_INTERVAL", "2"))
+
+# Whatever happens during the crawl, the ids found so far are written
+try:
+    # ===== PARALLEL MODE =====
+    if crawler_mode == "parallel":
+
+        # One request budget for the main browser and the crawler workers
+        limiter = DomainRateLimiter(min_interval=min_interval)
+
+        # Discover the page count of every competition/season once (page 1 is harvested directly)
+        jobs = []
+        for season, comp in [(season, comp) for season in seasons for comp in comps_links]:
+            page_url = results_page_url(url, comp, 1, season_slug(season))
+            # A slow or broken competition is skipped; the others (and pending_rows) are kept
+            try:
+                limiter.wait(page_url)
+                driver.get(page_url)
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, 'div[data-testid="game-row"]'))
+                )
+                n_pages = count_result_pages(driver)
+                print(f'The number of pages needed for {comp} ({season}) is {n_pages}')
+                metrics.page(market="results")
+
+                scroll_until_stable(driver)
+                buffer_new_ids(parse_game_row_links(driver.page_source), comp, season,
+                               existing_ids, pending_rows)
+            except (TimeoutException, WebDriverException):
+                print(f'ERROR! Could not discover the pages of {comp} ({season}), skipping it')
+                continue
 
-            # Force full reload (needed because hash does not refresh data)
-            driver.refresh()
+            for page in range(2, n_pages + 1):
+                jobs.append(((season, comp), page, results_page_url(url, comp, page, season_slug(season))))
+
+        # Fetch the remaining pages concurrently within the shared rate budget
+        results, failed = crawl_result_pages(
+            jobs=jobs,
+            make_driver=lambda: create_driver(service, browser_profile),
+            base_url=url,
+            n_workers=n_workers,
+            limiter=limiter,
+            metrics=metrics
+        )
+
+        # Retry failed pages once on the main browser
+        for key, page, page_url in failed:
+            try:
+                limiter.wait(page_url)
+                results[(key, page)] = parse_game_row_links(
+                    load_results_page(driver, page_url))
+            except (TimeoutException, WebDriverException):
+                print(f'ERROR! Could not collect {page_url}')
+
+        # Buffer results in competition/page order
+        for ((season, comp), page) in sorted(results):
+            buffer_new_ids(results[((season, comp), page)], comp, season, existing_ids, pending_rows)
+
+    # ===== SEQUENTIAL MODE: loop over each competition =====
+    else:
+        for season, comp in [(season, comp) for season in seasons for comp in comps_links]:
+
+            # Load page 1 of results for the competition and season
+            driver.get(f'{url}{comp}-{season_slug(season)}/results/')
             time.sleep(5)
 
-            # For lazy loading: scroll up, then scroll fully down
-            driver.execute_script("window.scrollTo(0,0);")
-            time.sleep(2)
-            driver.execute_script("window.scrollTo(0,999999);")
-            time.sleep(2)
-
-        # === Parse page after lazy loading ===
-        html = driver.page_source
-        soup = BeautifulSoup(html, "html.parser")
+            # Pagination button selector used by OddsPortal
+            selector = 'a.pagination-link'
+
+            # Determine total number of <a.pagination-link> elements
+            # Assumes last element on first page is "Next"
+            pages = driver.find_elements(By.CSS_SELECTOR, selector)
+            n_pages = len(pages) - 1   # number of numeric pages
+            print(f'The number of pages needed for this competition is {n_pages}')
+
+            # Loop through all pages (1 = first page)
+            for page in range(1, n_pages + 1):
+
+                # === FIRST PAGE (no URL modification needed) ===
+                if page == 1:
+                    print('No link construction needed for this page')
+                    # Trigger lazy-loading by forcing scroll to bottom
+                    driver.execute_script("window.scrollTo(0,999999);")
+                    time.sleep(2)
+
+                # === SUBSEQUENT PAGES: construct URL + reload ===
+                else:
+                    # Build fragment URL for the page: /#/page/{page}/
+                    page_url = f'{url}{comp}-{season_slug(season)}/results/#/page/{page}/'
+
+                    # Load URL (hash navigation)
+                    driver.get(page_url)
+                    time.sleep(0.2)
+
+                    # Force full reload (needed because hash does not refresh data)
+                    driver.refresh()
+                    time.sleep(5)
+
+                    # For lazy loading: scroll up, then scroll fully down
+                    driver.execute_script("window.scrollTo(0,0);")
+                    time.sleep(2)
+                    driver.execute_script("window.scrollTo(0,999999);")
+                    time.sleep(2)
+
+                # === Parse page after lazy loading ===
+                odds_ids = parse_game_row_links(driver.page_source)
+                buffer_new_ids(odds_ids, comp, season, existing_ids, pending_rows)
+
+            # After finishing this competition, return to base URL
+            driver.get(url)
+            time.sleep(5)
 
-        # Find all match rows using data-testid attribute
-        list_fixtures = soup.find_all("div", attrs={'data-testid': 'game-row'})
+finally:
+    # === Append all new match ids in one bulk write ===
+    if pending_rows:
+        ws.append_rows(pending_rows, value_input_option="RAW")
+    print(f'Appended {len(pending_rows)} new match ids')
 
-        # Collect match URLs
-        odds_ids = []
-        for fixture in list_fixtures:
-            link_tag = fixture.find('a', href=True)
-            if not link_tag:
-                continue
-            odds_id = link_tag['href']
-            odds_ids.append(odds_id)
-
-        # Check for duplicate IDs on the page
-        unique_check = len(odds_ids) == len(set(odds_ids))
-        print(f'All match ids are unique: {unique_check}')
-
-        # Load existing rows from sheet for duplication check
-        sheet = ws.get_all_values()
-        existing_ids = []
-
-        # Build list of existing IDs for this competition only
-        for row in sheet[1:]:
-            if len(row) >= 2 and row[1].strip() == comp:
-                existing_ids.append(row[0])
-
-        # Assemble rows to insert into Google Sheet
-        rows = []
-        for odds_id in odds_ids:
-            if odds_id not in existing_ids:
-                rows.append([odds_id, comp])
-
-        # Append new match IDs (if any)
-        if rows:
-            ws.append_rows(rows, value_input_option="RAW")
-        else:
-            print('All collected match ids are already getting tracked!')
-
-    # After finishing this competition, return to base URL
-    driver.get(url)
-    time.sleep(5)
-
-# === Sanity check: count how many ids per competition ===
-sheet = ws.get_all_values()
+# === Sanity check: count how many ids per competition (from the local index) ===
+comp_counts = Counter(id_comp for _, id_comp in existing_ids)
 result_n = []
 
 for comp in comps_links:
-    comp_filter = [row for row in sheet if row[1] == comp]
-    n_rows = len(comp_filter)
+    n_rows = comp_counts[comp]
     result_n.append({'comp': comp, 'n': n_rows})
 
 print(result_n)
+
+metrics.close()
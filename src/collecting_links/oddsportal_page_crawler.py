@@ -0,0 +1,183 @@
+# Importing required libraries
+import threading
+import time
+from queue import Queue, Empty
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+from bs4 import BeautifulSoup
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+# Selectors used on the OddsPortal results pages
+css_game_row = 'div[data-testid="game-row"]'
+css_pagination = 'a.pagination-link'
+
+
+# === Helper: shared request budget per domain (thread safe) ===
+class DomainRateLimiter:
+    def __init__(self, min_interval=2.0):
+        # Minimum number of seconds between two requests to the same domain
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.next_slot = {}
+
+    def wait(self, url):
+        domain = urlparse(url).netloc
+
+        # Reserve the next free slot for this domain, then sleep outside the lock
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(domain, now))
+            self.next_slot[domain] = slot + self.min_interval
+
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+# === Helper: accept the OneTrust cookie banner ===
+def accept_cookies_oddsportal(driver, wait_time=10):
+    wait = WebDriverWait(driver, wait_time)
+    wait.until(EC.presence_of_element_located((By.ID, "onetrust-consent-sdk")))
+    accept_btn = wait.until(
+        EC.element_to_be_clickable((By.ID, "onetrust-accept-btn-handler"))
+    )
+    accept_btn.click()
+
+
+# === Helper: build the url of one results page ===
+def results_page_url(base_url, comp_link, page, season_slug='2024-2025'):
+    if page == 1:
+        return f'{base_url}{comp_link}-{season_slug}/results/'
+    return f'{base_url}{comp_link}-{season_slug}/results/#/page/{page}/'
+
+
+# === Helper: number of numeric pages on a loaded results page ===
+def count_result_pages(driver):
+    # Assumes last <a.pagination-link> element is "Next"
+    pages = driver.find_elements(By.CSS_SELECTOR, css_pagination)
+    return max(len(pages) - 1, 1)
+
+
+# === Helper: collect match links from the results html ===
+def parse_game_row_links(html):
+    soup = BeautifulSoup(html, "html.parser")
+    odds_ids = []
+    for fixture in soup.find_all("div", attrs={'data-testid': 'game-row'}):
+        link_tag = fixture.find('a', href=True)
+        if link_tag:
+            odds_ids.append(link_tag['href'])
+    return odds_ids
+
+
+# === Helper: scroll until the lazy-loaded list stops growing ===
+def scroll_until_stable(driver, max_wait=6, poll=0.5):
+    n_rows = -1
+    deadline = time.monotonic() + max_wait
+    while time.monotonic() < deadline:
+        driver.execute_script("window.scrollTo(0,999999);")
+        time.sleep(poll)
+        current = len(driver.find_elements(By.CSS_SELECTOR, css_game_row))
+        if current == n_rows:
+            break
+        n_rows = current
+
+
+# === Helper: load one results page and return its html ===
+def load_results_page(driver, page_url, wait_time=10):
+    driver.get(page_url)
+
+    # Hash navigation does not refresh the data, so force a reload
+    if '#/page/' in page_url:
+        driver.refresh()
+
+    # Wait for the first rows instead of a fixed sleep
+    WebDriverWait(driver, wait_time).until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, css_game_row))
+    )
+    scroll_until_stable(driver)
+    return driver.page_source
+
+
+# === Crawler: fetch result pages concurrently over several browser contexts ===
+def crawl_result_pages(jobs, make_driver, base_url, n_workers=3, limiter=None, metrics=None):
+    # jobs: list of (comp_link, page, page_url); comp_link is only used as a label
+    # (the collector passes (season, comp_link) when it crawls several seasons)
+    # returns ({(comp_link, page): [odds_id, ...]}, [failed jobs])
+    if not jobs:
+        return {}, []
+
+    job_queue = Queue()
+    for job in jobs:
+        job_queue.put(job)
+
+    results = {}
+    failed = []
+    results_lock = threading.Lock()
+
+    def worker(worker_id):
+        driver = None
+        try:
+            # A browser that does not start stops this worker only; its jobs stay
+            # queued for the others and are reported failed if nobody takes them
+            try:
+                driver = make_driver()
+            except Exception as e:
+                print(f'[worker {worker_id}] WARNING! Browser did not start ({type(e).__name__}), worker stops')
+                return
+
+            # Each browser context needs its own cookie consent
+            try:
+                driver.get(base_url)
+                accept_cookies_oddsportal(driver)
+            except (TimeoutException, WebDriverException):
+                print(f'[worker {worker_id}] WARNING! Cookie banner not handled, worker stops')
+                return
+
+            while True:
+                try:
+                    comp_link, page, page_url = job_queue.get_nowait()
+                except Empty:
+                    break
+
+                if limiter is not None:
+                    limiter.wait(page_url)
+
+                start = time.time()
+                try:
+                    html = load_results_page(driver, page_url)
+                    odds_ids = parse_game_row_links(html)
+                except (TimeoutException, WebDriverException) as e:
+                    print(f'[worker {worker_id}] WARNING! Failed {page_url}: {type(e).__name__}')
+                    with results_lock:
+                        failed.append((comp_link, page, page_url))
+                    if metrics is not None:
+                        metrics.observe("scraper_wait_seconds", time.time() - start, result="failed")
+                        metrics.inc("scraper_block_suspicions_total")
+                    continue
+
+                if metrics is not None:
+                    metrics.observe("scraper_wait_seconds", time.time() - start, result="found")
+                    metrics.page(market="results")
+                    metrics.set("scraper_queue_depth", job_queue.qsize(), market="results")
+
+                print(f'[worker {worker_id}] {comp_link} page {page}: {len(odds_ids)} match ids')
+                with results_lock:
+                    results[(comp_link, page)] = odds_ids
+        finally:
+            if driver is not None:
+                driver.quit()
+
+    n_workers = max(1, min(n_workers, len(jobs)))
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        futures = [pool.submit(worker, i) for i in range(n_workers)]
+        for future in futures:
+            future.result()
+
+    # Jobs left over when every worker stopped early count as failed
+    while not job_queue.empty():
+        failed.append(job_queue.get_nowait())
+
+    return results, failed
@@ -8,10 +8,17 @@ from dotenv import load_dotenv
 import gspread
 from google.oauth2.service_account import Credentials
 import time
+import sys
+from collections import Counter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import NoSuchElementException
 
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from browser_profile import create_driver
+from season_config import selected_seasons, selected_competitions
+
 # === Helper function opta cookies ===
 
 def accept_cookies_if_present_opta(driver):
@@ -78,19 +85,32 @@ print("First row:", ws.row_values(1))
 # Set column names
 ws.update([["match_id", "competition"]], "A1:B1")
 
+# Read the sheet ONCE and build a set-based index of (match_id, competition)
+sheet = ws.get_all_values()
+existing_ids = set()
+for row in sheet[1:]:  # skip header
+    if len(row) >= 2:
+        existing_ids.add((row[0], row[1].strip()))
+
+# Rows discovered across all competitions and stages, appended in one bulk write
+pending_rows = []
+
 # === Collecting match id's ===
 
 # Setting up Chrome WebDriver with WebDriver Manager using Service
 service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
+# Browser profile: "full" (visible, loads everything) or "lean" (headless, blocks unneeded resources)
+browser_profile = os.getenv("BROWSER_PROFILE", "full")
+driver = create_driver(service, browser_profile)
 
 # Starting url
 url = 'https://optaplayerstats.statsperform.com/en_GB/soccer/competitions'
 
-# Select competitions
-comps = ['UEFA Champions League', 'UEFA Europa League']
+# Select competitions (only the European cups have qualifiers) and seasons
+comps = selected_competitions(['UEFA Champions League', 'UEFA Europa League'])
+seasons = selected_seasons()
 
-for comp in comps:
+for season, comp in [(season, comp) for season in seasons for comp in comps]:
     driver.get(url)          # Redirect to the base url
     time.sleep(5)            # Wait for page to load
     accept_cookies_if_present_opta(driver=driver)
@@ -99,9 +119,9 @@ for comp in comps:
     href = driver.find_element(By.LINK_TEXT, comp)
     href.click()
     time.sleep(5)
-    # Select the 24/25 season
+    # Select the season
     select = Select(driver.find_element(By.ID, "season-select"))
-    select.select_by_visible_text("2024/2025")
+    select.select_by_visible_text(season)
     time.sleep(5)            # Wait for whole page to load
 
     # Stages to scrape (qualifiers, play-offs etc.)
@@ -132,32 +152,24 @@ for comp in comps:
         unique_check = len(opta_ids) == len(set(opta_ids))
         print(f'[{comp} – {stage}] All match ids are unique: {unique_check}')
 
-        # Create list of already existing opta IDs
-        sheet = ws.get_all_values()
-
-        existing_ids = []
-        # Build existing list only for rows where column B == comp
-        for row in sheet[1:]:  # skip header
-            if len(row) >= 2 and row[1].strip() == comp:
-                existing_ids.append(row[0])
-
-        rows = []  # this will become a list of [match_id, competition]
-
+        # Buffer ids that are not tracked yet (set lookup, O(1) per id)
         for opta_id in opta_ids:
-            if opta_id not in existing_ids:
-                row = [opta_id, comp]
-                rows.append(row)
-
-        if rows:
-            ws.append_rows(rows, value_input_option="RAW")
-
-# Summary: how many rows per competition
-sheet = ws.get_all_values()
+            key = (opta_id, comp)
+            if key not in existing_ids:
+                existing_ids.add(key)
+                pending_rows.append([opta_id, comp])
+
+# Append all new match ids in one bulk write
+if pending_rows:
+    ws.append_rows(pending_rows, value_input_option="RAW")
+print(f'Appended {len(pending_rows)} new match ids')
+
+# Summary: how many rows per competition (from the local index)
+comp_counts = Counter(id_comp for _, id_comp in existing_ids)
 result_n = []
 
 for comp in comps:
-    comp_filter = [row for row in sheet[1:] if len(row) >= 2 and row[1] == comp]
-    n_rows = len(comp_filter)
+    n_rows = comp_counts[comp]
     result_n.append({'comp': comp, 'n': n_rows})
 
 print(result_n)
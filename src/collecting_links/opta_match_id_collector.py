@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 import gspread
 from google.oauth2.service_account import Credentials
 import time
+import sys
+from collections import Counter
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support.ui import WebDriverWait
@@ -15,6 +17,13 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import NoSuchElementException
 
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from browser_profile import create_driver
+from scrape_metrics import metrics_from_env, TimedStore
+from season_config import (selected_seasons, selected_competitions,
+                           season_row, opta_season_col)
+
 # === Helper function opta cookies ===
 
 def accept_cookies_if_present_opta(driver):
@@ -75,25 +84,43 @@ gc = gspread.authorize(creds)
 # Open spreadsheet
 sh = gc.open_by_key(sheet_id)
 ws = sh.sheet1
+
+# Live telemetry (METRICS_PORT in .env); sheet calls are timed
+metrics = metrics_from_env("opta_collector")
+ws = TimedStore(ws, metrics)
 print("Success! Connected to:", sh.title)
 print("First row:", ws.row_values(1))
 
 # Set column names
 ws.update([["match_id", "competition"]], "A1:B1")
+ws.update([["season"]], "H1")
+
+# Read the sheet ONCE and build a set-based index of (match_id, competition)
+sheet = ws.get_all_values()
+existing_ids = set()
+for row in sheet[1:]:  # skip header
+    if len(row) >= 2:
+        existing_ids.add((row[0], row[1].strip()))
+
+# Rows discovered this run, appended in one bulk write at the end
+pending_rows = []
 
 # === Collecting match id's ===
 
 # Setting up Chrome WebDriver with WebDriver Manager using Service
 service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
+# Browser profile: "full" (visible, loads everything) or "lean" (headless, blocks unneeded resources)
+browser_profile = os.getenv("BROWSER_PROFILE", "full")
+driver = create_driver(service, browser_profile)
 
 # Starting url
 url = 'https://optaplayerstats.statsperform.com/en_GB/soccer/competitions'
 
-# Select competition
-comps = ['Premier League', 'Bundesliga', 'Primera División', 'Ligue 1', 'Serie A', 'UEFA Champions League', 'UEFA Europa League']
+# Seasons and competitions to collect (SEASONS / COMPETITIONS in .env)
+seasons = selected_seasons()
+comps = selected_competitions()
 
-for comp in comps:
+for season, comp in [(season, comp) for season in seasons for comp in comps]:
     driver.get(url) # Redirect to the base url
     time.sleep(5)   # Wait for page to load
     accept_cookies_if_present_opta(driver=driver)
@@ -108,15 +135,17 @@ for comp in comps:
     stats_ref.click()
     time.sleep(5)
 
-    # Select the 24/25 season
+    # Select the season
     select = Select(driver.find_element(By.ID, "season-select"))
-    select.select_by_visible_text("2024/2025")
+    select.select_by_visible_text(season)
     time.sleep(5)   # Wait for whole page to load
 
     # Create Soup element
     html = driver.page_source
     soup = BeautifulSoup(html, "html.parser")
 
+    metrics.page(market="fixtures", competition=comp)
+
     # Collect competitions match-id's
     fixtures = soup.find("div", class_="Opta-fixtures-list")
     list_fixtures = fixtures.find_all("tbody", class_="Opta-fixture")
@@ -131,40 +160,33 @@ for comp in comps:
     unique_check = len(opta_ids) == len(set(opta_ids))
     print(f'All match ids are unique: {unique_check}')
 
-    # Create list of already existing opta id's
-    # read entire sheet
-    sheet = ws.get_all_values()
-
-    existing_ids = []
-    
-    # build existing list only for rows where column B == comp
-    for row in sheet[1:]:  # skip header
-        if len(row) >= 2:
-            if row[1].strip() == comp:
-                existing_ids.append(row[0])
-        
-    rows = []  # this will become a list of [match_id]
-
+    # Buffer ids that are not tracked yet (set lookup, O(1) per id)
+    new_for_comp = 0
     for opta_id in opta_ids:
-        if opta_id not in existing_ids:
-            row = [opta_id, comp]   # two rows: match_id, and comp
-            rows.append(row)
+        key = (opta_id, comp)
+        if key not in existing_ids:
+            existing_ids.add(key)
+            pending_rows.append(season_row([opta_id, comp], opta_season_col, season))   # match_id, comp, season (col H)
+            new_for_comp = new_for_comp + 1
 
-    if rows:
-        ws.append_rows(rows, value_input_option="RAW")
-    
-    if not rows:
+    if not new_for_comp:
         print('All collected match ids are already getting tracked!')
 
-sheet = ws.get_all_values()
+# Append all new match ids in one bulk write
+if pending_rows:
+    ws.append_rows(pending_rows, value_input_option="RAW")
+print(f'Appended {len(pending_rows)} new match ids')
+
+# Count ids per competition from the local index (no extra sheet read)
+comp_counts = Counter(id_comp for _, id_comp in existing_ids)
 result_n = []
 
 for comp in comps:
-    comp_filter = [row for row in sheet if row[1]==comp]
-    n_rows = len(comp_filter)
+    n_rows = comp_counts[comp]
     result_n.append(
         {'comp': comp,
          'n': n_rows}
     )
 print(result_n)
 
+metrics.close()
@@ -1,10 +1,14 @@
 # Import required packages
 import os
-import time
+import sys
 from dotenv import load_dotenv
 import gspread
 from google.oauth2.service_account import Credentials
 
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from state_store import open_state_store, prune_rows
+
 # === Load credentials ===
 
 # Load .env file
@@ -16,39 +20,41 @@ load_dotenv(env_path)
 json_relative = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 sheet_id = os.getenv("SPREADSHEET_ID")
 
-# Create filepath of Google API JSON key
-json_full_path = os.path.join(env_folder, json_relative)
+# Pick state-store backend ("sheet" = Google Sheet, "local" = CSV stand-in)
+backend = os.getenv("STATE_STORE", "sheet")
+dry_run = os.getenv("DRY_RUN", "0") == "1"
+prune_mode = os.getenv("PRUNE_MODE", "batch")   # "batch" (deleteDimension) or "rewrite"
+
+sh = None
+if backend == "sheet":
+    # Create filepath of Google API JSON key
+    json_full_path = os.path.join(env_folder, json_relative)
 
-scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
-gc = gspread.authorize(creds)
+    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+    creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
+    gc = gspread.authorize(creds)
 
-# Connect to spreadsheet
-sh = gc.open_by_key(sheet_id)
-ws = sh.get_worksheet(1)
-ws.update([["match_id", "competition"]], "A1:B1")
+    # Connect to spreadsheet
+    sh = gc.open_by_key(sheet_id)
+    sh.get_worksheet(1).update([["match_id", "competition"]], "A1:B1")
 
 # Collect qualifier IDs from worksheet 1
-wsq = sh.get_worksheet(1).get_all_values()[1:]
+store_qualifiers = open_state_store(backend, sh=sh, worksheet_index=1)
+wsq = store_qualifiers.get_all_values()[1:]
 opta_ids = [row[0] for row in wsq if row]
 
 bad_ids = set(opta_ids)
 
 # Access main sheet
-ws_main = sh.get_worksheet(0)
-main_rows = ws_main.get_all_values()
-data_rows = main_rows[1:]
+store_main = open_state_store(backend, sh=sh, worksheet_index=0)
 
-# Identify rows to delete
-rows_to_delete = []
-for i, row in enumerate(data_rows, start=2):
-    if row and row[0] in bad_ids:
-        rows_to_delete.append(i)
+# Identify rows to delete and remove them in one bulk call
+diff, ranges = prune_rows(store_main, bad_ids, dry_run=dry_run, mode=prune_mode)
 
 print("Rows to delete:")
-print(rows_to_delete)
+for sign, row_idx, row in diff:
+    print(f"{sign} row {row_idx}: {row}")
+print(f"{len(diff)} rows in {len(ranges)} contiguous ranges: {ranges}")
 
-# Delete rows safely (bottom-to-top)
-for row_idx in reversed(rows_to_delete):
-    ws_main.delete_rows(row_idx)
-    time.sleep(2)
+if dry_run:
+    print("Dry run, nothing deleted.")
@@ -0,0 +1,188 @@
+# Importing required libraries
+import os
+from array import array
+import numpy as np
+from fair_probabilities import line_pattern
+
+
+# === Per-bookmaker odds: dictionary-encoded wide store ===
+# One row per (match, market, line, bookmaker) with both sides' prices as float32.
+# Match, market, line label and bookmaker are codes into small dictionaries, so a
+# million prices take ~16 MB. Rows are sorted by (match, market, line, bookmaker)
+# and every (match, market, line) group is one contiguous slice:
+#   key_start[g]:key_start[g + 1] -> rows of group g
+# so margin / consensus queries are a handful of vectorised numpy calls.
+
+columns = ["match", "market", "line", "bookmaker"]
+code_types = {"match": np.uint32, "market": np.uint8, "line": np.uint16, "bookmaker": np.uint16}
+
+
+# === Helper: combined sort/search key of (match, market, line) ===
+def group_key(match, market, line):
+    return (np.asarray(match, dtype=np.uint64) << np.uint64(24)) \
+        | (np.asarray(market, dtype=np.uint64) << np.uint64(16)) \
+        | np.asarray(line, dtype=np.uint64)
+
+
+# === Helper: "Over/Under +2.5" -> 2.5, "Asian Handicap -1" -> -1.0 ===
+def line_value(label):
+    m = line_pattern.search(label)
+    if not m:
+        return np.nan
+    value = float(m.group(0))
+    return value if label.startswith("Asian") else abs(value)
+
+
+# === Helper: odds text -> float ("-", "NA" -> NaN) ===
+def to_price(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+# === Row-by-row builder used while extracting pages ===
+class BookmakerOddsBuilder:
+    def __init__(self):
+        self.dicts = {name: {} for name in columns}
+        self.codes = {name: array("I") for name in columns}
+        self.odds_1 = array("f")
+        self.odds_2 = array("f")
+
+    def code(self, name, value):
+        dictionary = self.dicts[name]
+        code = dictionary.get(value)
+        if code is None:
+            code = dictionary[value] = len(dictionary)
+        return code
+
+    # odds: the bookmaker's prices in page order (home/over first); "-" -> NaN
+    def append(self, match, market, line, bookmaker, odds):
+        for name, value in zip(columns, (match, market, line, bookmaker)):
+            self.codes[name].append(self.code(name, value))
+        self.odds_1.append(to_price(odds[0] if len(odds) >= 1 else None))
+        self.odds_2.append(to_price(odds[1] if len(odds) >= 2 else None))
+
+    def __len__(self):
+        return len(self.odds_1)
+
+    def build(self):
+        values = {name: list(self.dicts[name]) for name in columns}
+        codes = {name: np.frombuffer(self.codes[name], dtype=np.uint32).astype(code_types[name])
+                 for name in columns}
+        return BookmakerOdds(values, codes,
+                             np.frombuffer(self.odds_1, dtype=np.float32).copy(),
+                             np.frombuffer(self.odds_2, dtype=np.float32).copy())
+
+
+class BookmakerOdds:
+    def __init__(self, values, codes, odds_1, odds_2):
+        self.values = {name: np.asarray(values[name], dtype=object) for name in columns}
+        self.line_values = np.array([line_value(str(label)) for label in self.values["line"]],
+                                    dtype=np.float32)
+
+        # Sort once by (match, market, line, bookmaker)
+        order = np.lexsort([codes[name] for name in reversed(columns)])
+        self.codes = {name: codes[name][order] for name in columns}
+        self.odds_1 = odds_1[order]
+        self.odds_2 = odds_2[order]
+
+        # (match, market, line) index: sorted group keys + start offsets
+        keys = group_key(self.codes["match"], self.codes["market"], self.codes["line"])
+        if len(keys):
+            starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        self.keys = keys[starts]
+        self.key_start = np.r_[starts, len(keys)].astype(np.int64)
+        self.lookup = None   # name -> code, built on the first group() call
+
+    def __len__(self):
+        return len(self.odds_1)
+
+    def n_groups(self):
+        return len(self.keys)
+
+    # --- Lookup of one (match, market, line) by name ---
+    def group(self, match, market, line):
+        if self.lookup is None:
+            self.lookup = {name: {v: i for i, v in enumerate(self.values[name].tolist())}
+                           for name in columns}
+        codes = [self.lookup[name].get(value) for name, value in zip(columns, (match, market, line))]
+        if None in codes:
+            return None
+        g = int(np.searchsorted(self.keys, group_key(*codes)))
+        if g == len(self.keys) or self.keys[g] != group_key(*codes):
+            return None
+        rows = slice(self.key_start[g], self.key_start[g + 1])
+        return {
+            "bookmaker": self.values["bookmaker"][self.codes["bookmaker"][rows]],
+            "odds_1": self.odds_1[rows],
+            "odds_2": self.odds_2[rows],
+        }
+
+    # --- Bookmaker margin per row: 1/odds_1 + 1/odds_2 - 1 (NaN when a side is missing) ---
+    def margins(self):
+        return (1 / self.odds_1 + 1 / self.odds_2 - 1).astype(np.float32)
+
+    # --- Consensus per (match, market, line) over bookmakers quoting both sides ---
+    # n_books, mean margin, mean margin-free probability of side 1, best price per side
+    def consensus(self):
+        valid = np.isfinite(self.odds_1) & np.isfinite(self.odds_2)
+        p_1 = np.where(valid, (1 / self.odds_1) / (1 / self.odds_1 + 1 / self.odds_2), 0)
+        margin = np.where(valid, self.margins(), 0)
+        best_1 = np.where(valid, self.odds_1, -np.inf)
+        best_2 = np.where(valid, self.odds_2, -np.inf)
+
+        starts = self.key_start[:-1]
+        if not len(starts):
+            return {}
+        n_books = np.add.reduceat(valid.astype(np.int32), starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_p_1 = np.add.reduceat(p_1, starts) / n_books
+            mean_margin = np.add.reduceat(margin, starts) / n_books
+        return {
+            "match": self.values["match"][self.codes["match"][starts]],
+            "market": self.values["market"][self.codes["market"][starts]],
+            "line": self.values["line"][self.codes["line"][starts]],
+            "line_value": self.line_values[self.codes["line"][starts]],
+            "n_books": n_books,
+            "mean_margin": mean_margin.astype(np.float32),
+            "mean_p_1": mean_p_1.astype(np.float32),
+            "best_1": np.where(n_books > 0, np.maximum.reduceat(best_1, starts), np.nan).astype(np.float32),
+            "best_2": np.where(n_books > 0, np.maximum.reduceat(best_2, starts), np.nan).astype(np.float32),
+        }
+
+    # --- Persistence: one .npz of columns and dictionaries ---
+    def save(self, path):
+        arrays = {f"codes_{name}": self.codes[name] for name in columns}
+        arrays.update({f"values_{name}": self.values[name].astype(str) for name in columns})
+        # Write via a file object so numpy does not append ".npz" to the temporary name
+        with open(path + ".part", "wb") as f:
+            np.savez(f, odds_1=self.odds_1, odds_2=self.odds_2, **arrays)
+        os.replace(path + ".part", path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            values = {name: data[f"values_{name}"].tolist() for name in columns}
+            codes = {name: data[f"codes_{name}"] for name in columns}
+            return cls(values, codes, data["odds_1"], data["odds_2"])
+
+    # --- Stack several stores (e.g. partitions) into one, remapping the dictionaries ---
+    @classmethod
+    def concat(cls, stores):
+        values = {name: {} for name in columns}
+        codes = {name: [] for name in columns}
+        for store in stores:
+            for name in columns:
+                remap = np.array([values[name].setdefault(v, len(values[name]))
+                                  for v in store.values[name].tolist()], dtype=np.int64)
+                codes[name].append(remap[store.codes[name]].astype(code_types[name])
+                                   if len(remap) else store.codes[name])
+        odds_1 = np.concatenate([s.odds_1 for s in stores]) if stores else np.zeros(0, np.float32)
+        odds_2 = np.concatenate([s.odds_2 for s in stores]) if stores else np.zeros(0, np.float32)
+        return cls({name: list(values[name]) for name in columns},
+                   {name: np.concatenate(codes[name]) if stores else np.zeros(0, code_types[name])
+                    for name in columns},
+                   odds_1, odds_2)
@@ -1,5 +1,5 @@
 import os
-import csv
+import json
 from bs4 import BeautifulSoup
 from datetime import datetime
 import re
@@ -8,6 +8,12 @@ from googleapiclient.http import MediaFileUpload
 from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 from google_auth_oauthlib.flow import InstalledAppFlow
+from region_parse import sliced_soup, oddsportal_targets, oddsportal_bookmaker_targets
+from kickoff import normalise_kickoff
+from row_validator import RowValidator, oddsportal_rules
+from row_store import CompactRows, oddsportal_kinds
+from partition_manifest import (list_partitions, changed_partitions, load_manifest,
+                                save_manifest, combine_csvs, combine_counts)
 
 # === Connect to Google API
 # Load .env file
@@ -45,6 +51,16 @@ drive_service = build("drive", "v3", credentials=creds)
 folder_path = "../../data/html/odds_portal"
 csv_path = "../../data/oddsportal/oddsportal_data.csv"
 
+# Timezone the kickoff times were displayed in while scraping
+source_tz = os.getenv("ODDSPORTAL_TZ", "Europe/Amsterdam")
+
+# Parse mode: "sliced" (only the needed page regions, full-parse fallback) or "full"
+parse_mode = os.getenv("PARSE_MODE", "sliced")
+
+# BOOKMAKER_ODDS=1: also keep every bookmaker's price per line (needs numpy and pages
+# scraped with BOOKMAKER_ODDS=1, which expands the lines before saving)
+bookmaker_odds = os.getenv("BOOKMAKER_ODDS", "0") == "1"
+
 def extract_teams_from_participants(soup):
     participants = soup.find('div', {'data-testid': 'game-participants'})
     home, away = "NA", "NA"
@@ -90,47 +106,176 @@ def extract_date_time(soup):
     return kickoff_raw
 
 def extract_ah_odds_bsoup(filepath):
-    with open(filepath, encoding="utf-8") as f:
-        soup = BeautifulSoup(f, "html.parser")
+    if parse_mode == "sliced":
+        soup, _ = sliced_soup(filepath, oddsportal_bookmaker_targets if bookmaker_odds else oddsportal_targets)
+    else:
+        with open(filepath, encoding="utf-8") as f:
+            soup = BeautifulSoup(f, "html.parser")
 
     competition = extract_competition(soup)
     home, away = extract_teams_from_participants(soup)
     kickoff_raw = extract_date_time(soup)
 
     # --- Odds Extraction ---
-    rows = []
+    blocks = []
     for block in soup.find_all("div", attrs={"data-testid": "over-under-collapsed-row"}):
         ah_label_p = block.find("p", class_="max-sm:!hidden")
         ah_label = ah_label_p.get_text(strip=True) if ah_label_p else "NA"
         odds = [p.get_text(strip=True) for p in block.find_all("p", attrs={"data-testid": "odd-container-default"})]
-        if len(odds) >= 2:
-            home_odd = odds[0]
-            away_odd = odds[1]
-        
+        blocks.append((ah_label, odds))
+
+    bookmaker_rows = extract_bookmaker_rows(soup) if bookmaker_odds else []
+    return build_odds_rows(home, away, competition, kickoff_raw, blocks), bookmaker_rows
+
+def extract_bookmaker_rows(soup):
+    # Collapsed (line) and expanded (bookmaker) rows in page order: each bookmaker
+    # row belongs to the last line row before it
+    rows = []
+    line = "NA"
+    row_ids = ["over-under-collapsed-row", "over-under-expanded-row"]
+    for div in soup.find_all("div", attrs={"data-testid": row_ids}):
+        if div["data-testid"] == "over-under-collapsed-row":
+            label_p = div.find("p", class_="max-sm:!hidden")
+            line = label_p.get_text(strip=True) if label_p else "NA"
+            continue
+        name_p = div.find("p", attrs={"data-testid": "outrights-expanded-bookmaker-name"})
+        logo = div.find("img", alt=True)
+        bookmaker = name_p.get_text(strip=True) if name_p else (logo["alt"].strip() if logo else "")
+        if not bookmaker:
+            continue
+        odds = [p.get_text(strip=True) for p in div.select('div[data-testid="odd-container"] p')]
+        rows.append((line, bookmaker, odds))
+    return rows
+
+def build_odds_rows(home, away, competition, kickoff_raw, blocks):
+    rows = []
+    for ah_label, odds in blocks:
+        # Missing sides stay "NA" (never reuse the previous block's odds)
+        home_odd = odds[0] if len(odds) >= 1 else "NA"
+        away_odd = odds[1] if len(odds) >= 2 else "NA"
+
         rows.append([home, away, competition, kickoff_raw, ah_label, home_odd, away_odd])
     return rows
+
+def extract_ah_odds_json(filepath):
+    # Page captured in the browser (CAPTURE_MODE=json/both), no HTML parse needed
+    with open(filepath, encoding="utf-8") as f:
+        data = json.load(f)
+    return (build_odds_rows(data["home"], data["away"], data["competition"],
+                            data["kickoff_raw"], data["blocks"]),
+            data.get("bookmakers", []))
+
+csv_header = ["Filename", "HomeTeam", "AwayTeam", "Competition",
+              "KickoffRaw", "Market", "HomeOdd", "AwayOdd", "KickoffUTC", "KickoffEpoch", "ScrapedAt"]
+
+# Inline data-quality checks (opt-in, VALIDATE=1): bad rows go to a quarantine file
+# with reason codes instead of the main CSV. Off by default, because one-sided odds,
+# "Unknown" competitions and missing scores are what src/error_and_NA_insights counts.
+# Each partition keeps its own quarantine/quality files; they are combined at the end.
+validate = os.getenv("VALIDATE", "0") == "1"
+quarantine_path = "../../data/oddsportal/oddsportal_quarantine.csv"
+quality_path = "../../data/oddsportal/oddsportal_quality.json"
+validator = None
+
+def add_row(row, scraped_at):
+    # Normalise kickoff to UTC (ISO + epoch) and validate as the row is produced
+    row.extend(normalise_kickoff(row[4], source_tz))
+    # When the page was saved (capture file mtime), used to merge scraper outputs
+    row.append(int(scraped_at))
+    if validator is None or validator.accept(row):
+        all_rows.append(row)
+
+# === Partitions: only season=/competition= folders whose pages changed are extracted ===
+out_root = os.path.dirname(csv_path)
+os.makedirs(out_root, exist_ok=True)
+manifest_path = os.path.join(out_root, "partitions_manifest.json")
+fair_probs = os.getenv("FAIR_PROBS", "0") == "1"
+config = f"validate={validate};fair_probs={fair_probs};bookmaker_odds={bookmaker_odds}"
+if bookmaker_odds:
+    from bookmaker_odds import BookmakerOddsBuilder, BookmakerOdds
+
+partitions = list_partitions(folder_path)
+manifest = {} if os.getenv("FULL_REBUILD", "0") == "1" else load_manifest(manifest_path)
+changed = changed_partitions(partitions, manifest, out_root, "oddsportal_data.csv", config)
+print(f"{len(changed)} of {len(partitions)} partitions changed since the last run")
+
 done = 0
-all_rows = []
-for filename in os.listdir(folder_path):
-    if filename.endswith(".html"):
-        file_path = os.path.join(folder_path, filename)
-        ah_rows = extract_ah_odds_bsoup(file_path)
-        for row in ah_rows:
-            all_rows.append([filename] + row)
-    done = done +1
-    print(f'{done}    /    {len(os.listdir(folder_path))}')
-
-# Ensure the output directory exists:
-os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-
-with open(csv_path, "w", newline='', encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow([
-    "Filename", "HomeTeam", "AwayTeam", "Competition",
-    "KickoffRaw", "Market", "HomeOdd", "AwayOdd"])
-    writer.writerows(all_rows)
-
-print(f"Done! Extracted Asian handicap and over/under odds and meta-data from {len(os.listdir(folder_path))} matches out of the total {len(os.listdir(folder_path))} files.")
+for key, signature in changed.items():
+    part_folder = partitions[key]
+    part_out = os.path.join(out_root, key)
+    os.makedirs(part_out, exist_ok=True)
+
+    # JSON captures win over the HTML of the same page
+    filenames = os.listdir(part_folder)
+    json_stems = {fn[:-len(".json")] for fn in filenames if fn.endswith(".json")}
+
+    # Interned, typed columns instead of a list of string lists
+    all_rows = CompactRows(csv_header, oddsportal_kinds)
+    bookmakers = BookmakerOddsBuilder() if bookmaker_odds else None
+    if validate:
+        validator = RowValidator(oddsportal_rules(), os.path.join(part_out, "oddsportal_quarantine.csv"), csv_header)
+    for filename in filenames:
+        if filename.endswith(".html") and filename[:-len(".html")] not in json_stems:
+            file_path = os.path.join(part_folder, filename)
+            ah_rows, bookmaker_rows = extract_ah_odds_bsoup(file_path)
+            scraped_at = os.path.getmtime(file_path)
+            for row in ah_rows:
+                add_row([filename] + row, scraped_at)
+        elif filename.endswith(".json"):
+            file_path = os.path.join(part_folder, filename)
+            ah_rows, bookmaker_rows = extract_ah_odds_json(file_path)
+            scraped_at = os.path.getmtime(file_path)
+            # Filename keeps the .html suffix so downstream ids stay the same
+            filename = filename[:-len(".json")] + ".html"
+            for row in ah_rows:
+                add_row([filename] + row, scraped_at)
+        else:
+            continue
+        if bookmakers is not None:
+            # Market is the file prefix: ou_<hash>.html / ah_<hash>.html
+            for line, bookmaker, odds in bookmaker_rows:
+                bookmakers.append(filename, filename[:2], line, bookmaker, odds)
+        done = done +1
+        print(f'{key}: {done} pages')
+
+    part_csv = os.path.join(part_out, "oddsportal_data.csv")
+    all_rows.write_csv(part_csv)
+    if os.getenv("OUTPUT_PARQUET", "0") == "1":
+        all_rows.write_parquet(part_csv.replace(".csv", ".parquet"))
+
+    # === Optional: ready-to-fit long table with fair probabilities (needs numpy) ===
+    if fair_probs:
+        from fair_probabilities import build_fair_long_table, write_long_csv
+        write_long_csv(os.path.join(part_out, "oddsportal_long.csv"), build_fair_long_table(all_rows))
+
+    if bookmakers is not None:
+        bookmakers.build().save(os.path.join(part_out, "oddsportal_bookmakers.npz"))
+    if validator is not None:
+        validator.close(stats_path=os.path.join(part_out, "oddsportal_quality.json"))
+
+    manifest[key] = {"signature": signature, "config": config}
+    save_manifest(manifest_path, manifest)
+
+# === Combine all partitions into the flat files the rest of the pipeline reads ===
+part_keys = sorted(partitions)
+n_rows = combine_csvs([os.path.join(out_root, key, "oddsportal_data.csv") for key in part_keys], csv_path)
+if validate:
+    n_quarantined = combine_csvs([os.path.join(out_root, key, "oddsportal_quarantine.csv") for key in part_keys], quarantine_path)
+    quality = combine_counts([os.path.join(out_root, key, "oddsportal_quality.json") for key in part_keys], quality_path)
+    print(f"Data quality over all partitions: {quality} ({n_quarantined} rows in {quarantine_path})")
+if fair_probs:
+    long_path = "../../data/oddsportal/oddsportal_long.csv"
+    n_long = combine_csvs([os.path.join(out_root, key, "oddsportal_long.csv") for key in part_keys], long_path)
+    print(f"Fair-probability long table with {n_long} rows written to {long_path}")
+if bookmaker_odds:
+    # One store over all partitions, indexed by (match, market, line)
+    bookmaker_path = "../../data/oddsportal/oddsportal_bookmakers.npz"
+    part_stores = [os.path.join(out_root, key, "oddsportal_bookmakers.npz") for key in part_keys]
+    all_bookmakers = BookmakerOdds.concat([BookmakerOdds.load(p) for p in part_stores if os.path.exists(p)])
+    all_bookmakers.save(bookmaker_path)
+    print(f"{len(all_bookmakers)} bookmaker prices over {all_bookmakers.n_groups()} (match, market, line) groups written to {bookmaker_path}")
+
+print(f"Done! Extracted Asian handicap and over/under odds and meta-data from {done} pages in {len(changed)} changed partitions ({n_rows} rows over {len(partitions)} partitions).")
 
 # CSV file produced by your scraper
 local_path = csv_path
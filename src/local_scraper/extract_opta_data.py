@@ -1,8 +1,7 @@
 import os
-import csv
+import json
 import re
 from bs4 import BeautifulSoup
-from datetime import datetime
 from dotenv import load_dotenv
 
 # Google APIs
@@ -10,6 +9,14 @@ from googleapiclient.discovery import build
 from googleapiclient.http import MediaFileUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 
+from region_parse import sliced_soup, opta_targets
+from kickoff import normalise_kickoff
+from row_validator import RowValidator, opta_rules
+from row_store import CompactRows, opta_kinds
+from player_stats import PlayerStatsWriter, parse_player_stats
+from partition_manifest import (list_partitions, changed_partitions, load_manifest,
+                                save_manifest, combine_csvs, combine_counts)
+
 # === Load .env Configuration ===
 env_path = '../../.env'
 env_folder = '../../'
@@ -39,6 +46,12 @@ drive_service = build("drive", "v3", credentials=creds)
 folder_path = "../../data/html"
 csv_path    = "../../data/opta/opta_data.csv"
 
+# Timezone the kickoff times were displayed in while scraping
+source_tz = os.getenv("OPTA_TZ", "Europe/Amsterdam")
+
+# Parse mode: "sliced" (only the needed page regions, full-parse fallback) or "full"
+parse_mode = os.getenv("PARSE_MODE", "sliced")
+
 
 # === Helper: Team cleaner ===
 def clean_team_name(name: str) -> str:
@@ -48,84 +61,168 @@ def clean_team_name(name: str) -> str:
     return name.strip()
 
 
+csv_header = ["HomeTeam", "AwayTeam", "HomeGoals", "AwayGoals", "KickoffTimeRaw",
+              "Competition", "Filename", "KickoffUTC", "KickoffEpoch", "ScrapedAt"]
+
+# Inline data-quality checks (opt-in, VALIDATE=1): bad rows go to a quarantine file
+# with reason codes instead of the main CSV. Off by default, because one-sided odds,
+# "Unknown" competitions and missing scores are what src/error_and_NA_insights counts.
+# Each partition keeps its own quarantine/quality files; they are combined at the end.
+validate = os.getenv("VALIDATE", "0") == "1"
+quarantine_path = "../../data/opta/opta_quarantine.csv"
+quality_path = "../../data/opta/opta_quality.json"
+validator = None
+
+def add_row(row, scraped_at):
+    # Normalise kickoff to UTC (ISO + epoch) and validate as the row is produced
+    row.extend(normalise_kickoff(row[4], source_tz))
+    # When the page was saved (capture file mtime), used to merge scraper outputs
+    row.append(int(scraped_at))
+    if validator is None or validator.accept(row):
+        results.append(row)
+
+
+# === Partitions: only season=/competition= folders whose pages changed are extracted ===
+out_root = os.path.dirname(csv_path)
+os.makedirs(out_root, exist_ok=True)
+manifest_path = os.path.join(out_root, "partitions_manifest.json")
+# PLAYER_STATS=1: also turn the player-stats tables into a long (match, team, player, stat, value) table
+player_stats = os.getenv("PLAYER_STATS", "0") == "1"
+config = f"validate={validate};player_stats={player_stats}"
+
+partitions = list_partitions(folder_path)
+manifest = {} if os.getenv("FULL_REBUILD", "0") == "1" else load_manifest(manifest_path)
+changed = changed_partitions(partitions, manifest, out_root, "opta_data.csv", config)
+print(f"{len(changed)} of {len(partitions)} partitions changed since the last run")
+
 # === HTML Parsing ===
-results = []
-html_files = [fn for fn in os.listdir(folder_path) if fn.endswith(".html")]
-
-done = 0
-for filename in html_files:
-    file_path = os.path.join(folder_path, filename)
-
-    with open(file_path, encoding="utf-8") as f:
-        soup = BeautifulSoup(f, "html.parser")
-
-    # Defaults
-    home_team = away_team = "NA"
-    home_goals = away_goals = "NA"
-    comp_name = "Unknown"
-    kickoff_raw = "NA"
-
-    # ---- Teams + Goals ----
-    header_table = soup.find("table", class_=re.compile("Opta-MatchHeader"))
-
-    if header_table:
-        for td in header_table.find_all("td"):
-            td_class = td.get("class", [])
-            text = td.get_text(strip=True)
-
-            if "Opta-TeamName" in td_class:
-                if any("Home" in c for c in td_class):
-                    home_team = clean_team_name(text)
-                elif any("Away" in c for c in td_class):
-                    away_team = clean_team_name(text)
-
-        score_spans = header_table.find_all("span", class_=re.compile("Opta-Team-Score"))
-        if len(score_spans) >= 2:
-            home_goals = score_spans[0].get_text(strip=True)
-            away_goals = score_spans[1].get_text(strip=True)
-        elif len(score_spans) == 1:
-            home_goals = score_spans[0].get_text(strip=True)
-
-    # ---- Kickoff ----
-    date_span = soup.find("span", class_="Opta-Date")
-    kickoff_raw = date_span.get_text(strip=True) if date_span else "NA"
-
-    # ---- Competition ----
-    comp_span = soup.find("span", class_="Opta-Competition")
-    comp_name = comp_span.get_text(strip=True) if comp_span else "Unknown"
-
-    # Add row
-    results.append([
-        home_team,
-        away_team,
-        home_goals,
-        away_goals,
-        kickoff_raw,
-        comp_name,
-        filename
-    ])
-
-    done += 1
-    print(f"{done} / {len(html_files)}")
-
-
-# === Save CSV ===
-os.makedirs(os.path.dirname(csv_path), exist_ok=True)
-
-with open(csv_path, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerow([
-        "HomeTeam",
-        "AwayTeam",
-        "HomeGoals",
-        "AwayGoals",
-        "KickoffTimeRaw",
-        "Competition",
-        "Filename"
-    ])
-    writer.writerows(results)
-
-print(f"Done! Processed {len(results)} matches.")
+for key, signature in changed.items():
+    part_folder = partitions[key]
+    part_out = os.path.join(out_root, key)
+    os.makedirs(part_out, exist_ok=True)
+
+    # Interned, typed columns instead of a list of string lists
+    results = CompactRows(csv_header, opta_kinds)
+    if validate:
+        validator = RowValidator(opta_rules(), os.path.join(part_out, "opta_quarantine.csv"), csv_header)
+    stats_writer = PlayerStatsWriter(os.path.join(part_out, "opta_player_stats.parquet")) if player_stats else None
+    filenames = os.listdir(part_folder)
+    html_files = [fn for fn in filenames if fn.endswith(".html")]
+
+    # Pages captured in the browser as JSON (CAPTURE_MODE=json/both) need no HTML parse
+    json_files = [fn for fn in filenames if fn.endswith(".json")]
+    json_stems = {fn[:-len(".json")] for fn in json_files}
+    html_files = [fn for fn in html_files if fn[:-len(".html")] not in json_stems]
+
+    for filename in json_files:
+        with open(os.path.join(part_folder, filename), encoding="utf-8") as f:
+            data = json.load(f)
+
+        # Filename keeps the .html suffix so downstream ids stay the same
+        add_row([
+            clean_team_name(data["home_team"]),
+            clean_team_name(data["away_team"]),
+            data["home_goals"],
+            data["away_goals"],
+            data["kickoff_raw"],
+            data["competition"],
+            filename[:-len(".json")] + ".html"
+        ], os.path.getmtime(os.path.join(part_folder, filename)))
+
+        # Player tables are only in the HTML (present with CAPTURE_MODE=both)
+        html_path = os.path.join(part_folder, filename[:-len(".json")] + ".html")
+        if stats_writer is not None and os.path.exists(html_path):
+            for stat_row in parse_player_stats(html_path, clean_team_name(data["home_team"]),
+                                               clean_team_name(data["away_team"])):
+                stats_writer.append(stat_row)
+
+    done = 0
+    for filename in html_files:
+        file_path = os.path.join(part_folder, filename)
+
+        if parse_mode == "sliced":
+            soup, _ = sliced_soup(file_path, opta_targets)
+        else:
+            with open(file_path, encoding="utf-8") as f:
+                soup = BeautifulSoup(f, "html.parser")
+
+        # Defaults
+        home_team = away_team = "NA"
+        home_goals = away_goals = "NA"
+        comp_name = "Unknown"
+        kickoff_raw = "NA"
+
+        # ---- Teams + Goals ----
+        header_table = soup.find("table", class_=re.compile("Opta-MatchHeader"))
+
+        if header_table:
+            for td in header_table.find_all("td"):
+                td_class = td.get("class", [])
+                text = td.get_text(strip=True)
+
+                if "Opta-TeamName" in td_class:
+                    if any("Home" in c for c in td_class):
+                        home_team = clean_team_name(text)
+                    elif any("Away" in c for c in td_class):
+                        away_team = clean_team_name(text)
+
+            score_spans = header_table.find_all("span", class_=re.compile("Opta-Team-Score"))
+            if len(score_spans) >= 2:
+                home_goals = score_spans[0].get_text(strip=True)
+                away_goals = score_spans[1].get_text(strip=True)
+            elif len(score_spans) == 1:
+                home_goals = score_spans[0].get_text(strip=True)
+
+        # ---- Kickoff ----
+        date_span = soup.find("span", class_="Opta-Date")
+        kickoff_raw = date_span.get_text(strip=True) if date_span else "NA"
+
+        # ---- Competition ----
+        comp_span = soup.find("span", class_="Opta-Competition")
+        comp_name = comp_span.get_text(strip=True) if comp_span else "Unknown"
+
+        # Add row
+        add_row([
+            home_team,
+            away_team,
+            home_goals,
+            away_goals,
+            kickoff_raw,
+            comp_name,
+            filename
+        ], os.path.getmtime(file_path))
+
+        if stats_writer is not None:
+            for stat_row in parse_player_stats(file_path, home_team, away_team):
+                stats_writer.append(stat_row)
+
+        done += 1
+        print(f"{done} / {len(html_files)}")
+
+    # === Save partition CSV ===
+    part_csv = os.path.join(part_out, "opta_data.csv")
+    results.write_csv(part_csv)
+    if os.getenv("OUTPUT_PARQUET", "0") == "1":
+        results.write_parquet(part_csv.replace(".csv", ".parquet"))
+    print(f"{key}: processed {len(results)} matches.")
+    if stats_writer is not None:
+        print(f"{key}: {stats_writer.close()} player-stat rows written to {stats_writer.path}")
+    if validator is not None:
+        validator.close(stats_path=os.path.join(part_out, "opta_quality.json"))
+
+    manifest[key] = {"signature": signature, "config": config}
+    save_manifest(manifest_path, manifest)
+
+
+# === Combine all partitions into the flat CSV the rest of the pipeline reads ===
+part_keys = sorted(partitions)
+n_rows = combine_csvs([os.path.join(out_root, key, "opta_data.csv") for key in part_keys], csv_path)
+if validate:
+    n_quarantined = combine_csvs([os.path.join(out_root, key, "opta_quarantine.csv") for key in part_keys], quarantine_path)
+    quality = combine_counts([os.path.join(out_root, key, "opta_quality.json") for key in part_keys], quality_path)
+    print(f"Data quality over all partitions: {quality} ({n_quarantined} rows in {quarantine_path})")
+
+print(f"Done! {len(changed)} changed partitions re-extracted, {n_rows} matches in total.")
 
 
 # === Upload to Google Drive ===
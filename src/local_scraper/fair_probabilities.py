@@ -0,0 +1,96 @@
+# Importing required libraries
+import re
+import csv
+import numpy as np
+
+# Same pattern as str_extract(Market, ...) in fit_bivariate_poisson.R
+line_pattern = re.compile(r"[+-]?[0-9]+(?:\.[0-9]+)?")
+
+long_header = [
+    "Filename", "scraping_id", "HomeTeam", "AwayTeam", "Competition", "KickoffRaw",
+    "market", "line_value", "side", "odds", "p_raw", "p_sum", "p_book", "odds_fair",
+    "half_line"
+]
+
+
+# === Helper: odds strings -> float array ("-" and other non-numbers -> NaN) ===
+def to_float_array(values):
+    out = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            pass
+    return out
+
+
+# === Helper: parse every distinct market label once ===
+def parse_market_labels(labels):
+    unique_labels, inverse = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+
+    is_asian = np.array([label.startswith("Asian") for label in unique_labels], dtype=bool)
+    line_raw = np.full(len(unique_labels), np.nan)
+    for i, label in enumerate(unique_labels):
+        m = line_pattern.search(label)
+        if m:
+            line_raw[i] = float(m.group(0))
+
+    # Signed handicap for AH, absolute total for O/U
+    line_value = np.where(is_asian, line_raw, np.abs(line_raw))
+    return is_asian[inverse], line_value[inverse]
+
+
+# === Fair (overround-free) probabilities for all rows at once ===
+# rows: [Filename, HomeTeam, AwayTeam, Competition, KickoffRaw, Market, HomeOdd, AwayOdd]
+def build_fair_long_table(rows):
+    if not rows:
+        return []
+
+    cols = list(zip(*rows))
+    filenames = np.asarray(cols[0], dtype=object)
+    is_asian, line_value = parse_market_labels(cols[5])
+    home_odd = to_float_array(cols[6])
+    away_odd = to_float_array(cols[7])
+
+    # Keep a line only when exactly two sides are quoted for (file, market, line),
+    # like filter(n() == 2) after dropping "-" odds in the R script
+    keys = np.array([f"{f}|{a}|{l!r}" for f, a, l in zip(filenames, is_asian, line_value)])
+    _, key_idx = np.unique(keys, return_inverse=True)
+    n_sides = np.isfinite(home_odd).astype(int) + np.isfinite(away_odd).astype(int)
+    sides_per_key = np.bincount(key_idx, weights=n_sides)
+    keep = (sides_per_key[key_idx] == 2) & (n_sides == 2) & np.isfinite(line_value)
+
+    # Remove bookmaker margin: p_raw = 1/odds, p_book = p_raw / sum(p_raw)
+    p_home = 1.0 / home_odd[keep]
+    p_away = 1.0 / away_odd[keep]
+    p_sum = p_home + p_away
+    p_book_home = p_home / p_sum
+    p_book_away = p_away / p_sum
+
+    lines = line_value[keep]
+    half_line = np.abs(np.mod(lines, 1) - 0.5) < 1e-6
+    asian = is_asian[keep]
+
+    # Long format: one output row per side
+    table = []
+    kept_rows = [row for row, k in zip(rows, keep) if k]
+    for i, row in enumerate(kept_rows):
+        filename = row[0]
+        scraping_id = re.sub(r"\.html$", "", filename[3:])
+        meta = [filename, scraping_id, row[1], row[2], row[3], row[4]]
+        market = "asian" if asian[i] else "over_under"
+        sides = ("home", "away") if asian[i] else ("over", "under")
+
+        for side, odds, p_raw, p_book in [(sides[0], row[6], p_home[i], p_book_home[i]),
+                                          (sides[1], row[7], p_away[i], p_book_away[i])]:
+            table.append(meta + [market, float(lines[i]), side, float(odds), float(p_raw),
+                                 float(p_sum[i]), float(p_book), float(1.0 / p_book),
+                                 "TRUE" if half_line[i] else "FALSE"])
+    return table
+
+
+def write_long_csv(path, table):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(long_header)
+        writer.writerows(table)
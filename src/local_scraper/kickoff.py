@@ -0,0 +1,42 @@
+# Importing required libraries
+import re
+from functools import lru_cache
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+# Month names/abbreviations as shown on OddsPortal ("10 Nov 2024") and Opta
+months = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# day, month (number or name), year, hour:minute -- same order dmy_hm() expects
+kickoff_pattern = re.compile(
+    r"(\d{1,2})\s*[\s./-]\s*([A-Za-z]+|\d{1,2})\.?\s*[\s./-]?\s*(\d{4})\D+(\d{1,2}):(\d{2})"
+)
+
+
+# === Parse one raw kickoff string to (ISO UTC, epoch seconds) ===
+# Each distinct (raw, source timezone) pair is parsed once; the cache is bounded.
+@lru_cache(maxsize=8192)
+def normalise_kickoff(raw, source_tz="Europe/Amsterdam"):
+    m = kickoff_pattern.search(raw or "")
+    if not m:
+        return "NA", "NA"
+
+    day, month, year, hour, minute = m.groups()
+    if month.isdigit():
+        month = int(month)
+    else:
+        month = months.get(month[:3].lower())
+        if month is None:
+            return "NA", "NA"
+
+    try:
+        local = datetime(int(year), month, int(day), int(hour), int(minute),
+                         tzinfo=ZoneInfo(source_tz))
+    except ValueError:
+        return "NA", "NA"
+
+    utc = local.astimezone(timezone.utc)
+    return utc.strftime("%Y-%m-%dT%H:%M:%SZ"), int(utc.timestamp())
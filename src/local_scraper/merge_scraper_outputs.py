@@ -0,0 +1,166 @@
+# Importing required libraries
+import os
+import csv
+import glob
+import heapq
+import tempfile
+from itertools import groupby
+
+
+# === Merge the per-scraper extraction outputs into the *_merged.csv inputs ===
+# Every scraper uploads its own opta_data_{SCRAPER_ID}.csv / oddsportal_data_{SCRAPER_ID}.csv.
+# Each file is cut into sorted runs on disk, the runs are k-way merged as streams and
+# rows with the same (Filename, Market) are deduped: the latest ScrapedAt wins.
+# A label that occurs several times in one file (e.g. several "NA" labels) gets its
+# occurrence number in the key, so those rows stay separate.
+# Only one chunk per input is ever held in memory.
+# Run by src/merging_data/merging_data.R after it downloaded the per-scraper files.
+
+sources = {
+    "opta":       "../../data/opta",
+    "oddsportal": "../../data/oddsportal",
+}
+
+# Rows per sorted run (the memory bound while splitting an input file)
+chunk_rows = int(os.getenv("MERGE_CHUNK_ROWS", "200000"))
+
+
+# === Helper: one header for all inputs (older files may miss newer columns) ===
+def union_header(paths):
+    header = []
+    for path in paths:
+        with open(path, newline="", encoding="utf-8") as f:
+            for col in next(csv.reader(f), []):
+                if col not in header:
+                    header.append(col)
+    return header
+
+
+# === Helper: when was this row scraped? ScrapedAt column, else the file mtime ===
+def row_timestamp(value, fallback):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return fallback
+
+
+# === Split one input into sorted runs: [key..., -timestamp, source, row...] ===
+def write_sorted_runs(path, source_idx, header, tmp_dir):
+    fallback_ts = os.path.getmtime(path)
+    run_paths = []
+
+    def spill(chunk):
+        chunk.sort()
+        run_path = os.path.join(tmp_dir, f"run_{source_idx}_{len(run_paths)}.csv")
+        with open(run_path, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows([rec[:4] + tuple(rec[4]) for rec in chunk])
+        run_paths.append(run_path)
+
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        file_header = next(reader, [])
+        positions = [file_header.index(col) if col in file_header else None for col in header]
+        ts_pos = file_header.index("ScrapedAt") if "ScrapedAt" in file_header else None
+        key_pos = [file_header.index("Filename"),
+                   file_header.index("Market") if "Market" in file_header else None]
+
+        chunk = []
+        # Labels seen so far for the current page (rows of one page are contiguous)
+        seen = {}
+        for row in reader:
+            if not row:
+                continue
+            aligned = [row[p] if p is not None and p < len(row) else "NA" for p in positions]
+            ts = row_timestamp(row[ts_pos] if ts_pos is not None else None, fallback_ts)
+            key = [row[p] if p is not None else "" for p in key_pos]
+            if seen and key[0] not in seen:
+                seen = {}
+            labels = seen.setdefault(key[0], {})
+            n_seen = labels.get(key[1], 0)
+            labels[key[1]] = n_seen + 1
+            if n_seen:
+                key[1] = f"{key[1]}#{n_seen}"
+            # Negative timestamp so the newest row comes first within a key
+            chunk.append((key[0], key[1], -ts, source_idx, aligned))
+            if len(chunk) >= chunk_rows:
+                spill(chunk)
+                chunk = []
+        if chunk:
+            spill(chunk)
+
+    return run_paths
+
+
+# === Helper: stream one run file back as sortable tuples ===
+def read_run(run_path, n_cols):
+    with open(run_path, newline="", encoding="utf-8") as f:
+        for rec in csv.reader(f):
+            # rec = [filename, market, -ts, source, col_1, ..., col_n]
+            yield rec[0], rec[1], float(rec[2]), int(rec[3]), rec[4:4 + n_cols]
+
+
+# === Merge one source (opta or oddsportal) ===
+def merge_source(name, data_dir):
+    inputs = sorted(glob.glob(os.path.join(data_dir, f"{name}_data_*.csv")))
+    if not inputs:
+        print(f"No {name}_data_*.csv files found in {data_dir}, skipping.")
+        return
+
+    header = union_header(inputs)
+    ts_col = header.index("ScrapedAt") if "ScrapedAt" in header else None
+    merged_path = os.path.join(data_dir, f"{name}_merged.csv")
+    conflicts_path = os.path.join(data_dir, f"{name}_merge_conflicts.csv")
+
+    stats = {"rows_in": 0, "rows_out": 0, "duplicates": 0, "conflicts": 0}
+
+    with tempfile.TemporaryDirectory(dir=data_dir) as tmp_dir:
+        runs = []
+        for source_idx, path in enumerate(inputs):
+            runs.extend(write_sorted_runs(path, source_idx, header, tmp_dir))
+
+        streams = [read_run(run_path, len(header)) for run_path in runs]
+        merged = heapq.merge(*streams)
+
+        tmp_merged = merged_path + ".part"
+        with open(tmp_merged, "w", newline="", encoding="utf-8") as out, \
+             open(conflicts_path, "w", newline="", encoding="utf-8") as conf:
+            writer = csv.writer(out)
+            writer.writerow(header)
+            conflict_writer = csv.writer(conf)
+            conflict_writer.writerow(["Filename", "Market", "Source", "ScrapedAt", "Kept", "DifferentColumns"])
+
+            for (filename, market), group in groupby(merged, key=lambda rec: (rec[0], rec[1])):
+                group = list(group)   # one entry per scraper that saw this key
+                stats["rows_in"] += len(group)
+                winner = group[0]     # newest timestamp (ties: first input file)
+                writer.writerow(winner[4])
+                stats["rows_out"] += 1
+
+                if len(group) == 1:
+                    continue
+                stats["duplicates"] += len(group) - 1
+
+                # Conflict: same key, different values (ScrapedAt itself does not count)
+                different = set()
+                for rec in group[1:]:
+                    for i, col in enumerate(header):
+                        if i != ts_col and rec[4][i] != winner[4][i]:
+                            different.add(col)
+                if not different:
+                    continue
+
+                stats["conflicts"] += 1
+                for rec in group:
+                    conflict_writer.writerow([filename, market, os.path.basename(inputs[rec[3]]),
+                                              -rec[2], rec is winner, ";".join(sorted(different))])
+
+        os.replace(tmp_merged, merged_path)
+
+    print(f"{name}: merged {len(inputs)} files -> {merged_path}")
+    print(f"{name}: {stats}")
+    if stats["conflicts"]:
+        print(f"{name}: conflicting duplicates written to {conflicts_path}")
+
+
+for name, data_dir in sources.items():
+    merge_source(name, data_dir)
@@ -0,0 +1,107 @@
+# Importing required libraries
+import os
+import csv
+import json
+
+
+# === Partitions of a capture folder ===
+# Pages live in root/season=2024-2025/competition=premier-league/. Pages saved
+# directly in root by older runs form one extra partition called "legacy".
+# Returns {partition key: folder}, the key doubles as the relative output folder.
+def list_partitions(root):
+    parts = {}
+    if not os.path.isdir(root):
+        return parts
+
+    if any(fn.endswith((".html", ".json")) for fn in os.listdir(root)):
+        parts["legacy"] = root
+
+    for season_dir in sorted(os.listdir(root)):
+        season_path = os.path.join(root, season_dir)
+        if not season_dir.startswith("season=") or not os.path.isdir(season_path):
+            continue
+        for comp_dir in sorted(os.listdir(season_path)):
+            if comp_dir.startswith("competition="):
+                parts[f"{season_dir}/{comp_dir}"] = os.path.join(season_path, comp_dir)
+    return parts
+
+
+# === Cheap change detection: file count, total size and newest mtime ===
+def partition_signature(folder):
+    n_files, total_size, newest = 0, 0, 0
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.endswith((".html", ".json")):
+            stat = entry.stat()
+            n_files += 1
+            total_size += stat.st_size
+            newest = max(newest, stat.st_mtime_ns)
+    return [n_files, total_size, newest]
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(path, manifest):
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# === Which partitions need extracting? ===
+# A partition is redone when its pages changed, its output is missing or the
+# extraction settings (config) differ from the last run.
+def changed_partitions(parts, manifest, out_root, out_name, config):
+    changed = {}
+    for key, folder in parts.items():
+        signature = partition_signature(folder)
+        previous = manifest.get(key, {})
+        out_path = os.path.join(out_root, key, out_name)
+        if (previous.get("signature") != signature or previous.get("config") != config
+                or not os.path.exists(out_path)):
+            changed[key] = signature
+    return changed
+
+
+# === Concatenate per-partition CSVs into one file (streamed, header once) ===
+def combine_csvs(paths, out_path):
+    tmp_path = out_path + ".part"
+    n_rows = 0
+    header_written = False
+    with open(tmp_path, "w", newline="", encoding="utf-8") as out:
+        writer = csv.writer(out)
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            with open(path, newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader, None)
+                if header is None:
+                    continue
+                if not header_written:
+                    writer.writerow(header)
+                    header_written = True
+                for row in reader:
+                    writer.writerow(row)
+                    n_rows += 1
+    os.replace(tmp_path, out_path)
+    return n_rows
+
+
+# === Sum per-partition count files (e.g. data-quality stats) into one JSON ===
+def combine_counts(paths, out_path):
+    totals = {}
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            for name, n in json.load(f).items():
+                totals[name] = totals.get(name, 0) + n
+    tmp_path = out_path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(totals, f, indent=2)
+    os.replace(tmp_path, out_path)
+    return totals
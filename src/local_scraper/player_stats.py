@@ -0,0 +1,113 @@
+# Importing required libraries
+import os
+import re
+import csv
+from bs4 import BeautifulSoup, SoupStrainer
+from row_store import CompactRows
+
+# Long table: one row per (match, team, player, stat)
+stats_header = ["MatchId", "Team", "Player", "Stat", "Value"]
+stats_kinds = ["text", "text", "text", "text", "float"]
+
+# Only <table> elements are built when parsing a page for player stats
+tables_only = SoupStrainer("table")
+
+
+# === Helper: cell text -> number ("87%" -> 87.0, "-" -> "NA", stored as null) ===
+def stat_value(text):
+    text = text.strip().rstrip("%").replace(",", ".")
+    try:
+        return float(text)
+    except ValueError:
+        return "NA"
+
+
+# === Helper: column name from a header cell (full name in title/abbr when given) ===
+def stat_name(th):
+    abbr = th.find("abbr")
+    if abbr is not None and abbr.get("title"):
+        return abbr["title"].strip()
+    return (th.get("title") or th.get_text(strip=True)).strip()
+
+
+# === Parse all player-stats tables of one saved Opta page ===
+# Tables come in page order: the first one is the home side, the second the away side.
+def parse_player_stats(filepath, home_team, away_team):
+    with open(filepath, encoding="utf-8") as f:
+        soup = BeautifulSoup(f, "html.parser", parse_only=tables_only)
+
+    match_id = re.sub(r"\.html$", "", os.path.basename(filepath))
+    teams = [home_team, away_team]
+    rows = []
+
+    tables = [t for t in soup.find_all("table") if t.find("thead", class_="Opta-Player-Stats")]
+    for i, table in enumerate(tables):
+        team = teams[i] if i < len(teams) else "Unknown"
+        header_cells = table.find("thead", class_="Opta-Player-Stats").find_all("th")
+        stats = [stat_name(th) for th in header_cells[1:]]   # first column is the player
+
+        for tr in table.find_all("tr"):
+            if tr.find_parent("thead") is not None:
+                continue
+            cells = tr.find_all(["th", "td"])
+            if len(cells) < 2:
+                continue
+            player = cells[0].get_text(strip=True)
+            if not player:
+                continue
+            for stat, cell in zip(stats, cells[1:]):
+                rows.append([match_id, team, player, stat, stat_value(cell.get_text(strip=True))])
+    return rows
+
+
+# === Streaming writer: dictionary-encoded chunks to Parquet (CSV without pyarrow) ===
+# Rows are buffered in a CompactRows chunk and flushed as one Parquet row group,
+# so memory stays bounded by chunk_rows however many matches are processed.
+class PlayerStatsWriter:
+    def __init__(self, path, chunk_rows=100000):
+        self.chunk_rows = chunk_rows
+        self.n_rows = 0
+        self.chunk = CompactRows(stats_header, stats_kinds)
+        self.parquet = None
+        self.csv_file = None
+        try:
+            import pyarrow.parquet as pq
+            self.path = path
+            self.pq = pq
+        except ImportError:
+            print("pyarrow not installed, writing player stats as CSV")
+            self.path = path.replace(".parquet", ".csv")
+            self.pq = None
+
+    def append(self, row):
+        self.chunk.append(row)
+        self.n_rows += 1
+        if len(self.chunk) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.chunk:
+            return
+        if self.pq is not None:
+            table = self.chunk.to_arrow_table()
+            if self.parquet is None:
+                self.parquet = self.pq.ParquetWriter(self.path + ".part", table.schema)
+            self.parquet.write_table(table)
+        else:
+            if self.csv_file is None:
+                self.csv_file = open(self.path + ".part", "w", newline="", encoding="utf-8")
+                self.csv_writer = csv.writer(self.csv_file)
+                self.csv_writer.writerow(stats_header)
+            self.csv_writer.writerows(self.chunk)
+        self.chunk = CompactRows(stats_header, stats_kinds)
+
+    def close(self):
+        self.flush()
+        if self.parquet is not None:
+            self.parquet.close()
+        elif self.csv_file is not None:
+            self.csv_file.close()
+        else:
+            return 0
+        os.replace(self.path + ".part", self.path)
+        return self.n_rows
@@ -0,0 +1,88 @@
+# Importing required libraries
+import re
+import mmap
+from bs4 import BeautifulSoup
+
+
+# === Helper: find the full element (start tag .. matching end tag) around an anchor ===
+def element_span(buf, anchor_pos, tag):
+    # Start tag: last "<" before the anchor, with no ">" in between
+    start = buf.rfind(b"<", 0, anchor_pos)
+    if start == -1 or buf.find(b">", start, anchor_pos) != -1:
+        return None
+    if not re.match(rb"<" + tag + rb"\b", buf[start:start + len(tag) + 2]):
+        return None
+
+    # Walk open/close tags of the same name until the depth returns to zero
+    tag_re = re.compile(rb"<(/?)" + tag + rb"\b[^>]*?(/?)>")
+    depth = 0
+    for m in tag_re.finditer(buf, start):
+        if m.group(1):
+            depth = depth - 1
+        elif not m.group(2):
+            depth = depth + 1
+        if depth == 0:
+            return start, m.end()
+    return None
+
+
+# === Helper: all elements carrying an anchor (compiled bytes regex) ===
+def find_regions(buf, tag, anchor, first_only=False):
+    regions = []
+    m = anchor.search(buf)
+    while m is not None:
+        span = element_span(buf, m.start(), tag)
+        if span is None:
+            m = anchor.search(buf, m.end())
+            continue
+        regions.append(bytes(buf[span[0]:span[1]]))
+        if first_only:
+            break
+        m = anchor.search(buf, span[1])
+    return regions
+
+
+# === Region-sliced parse: only the fragments we need, full parse as fallback ===
+# targets: list of (tag, anchor regex, first_only) tuples, all of them must be found
+def sliced_soup(filepath, targets):
+    with open(filepath, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return BeautifulSoup("", "html.parser"), False
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            fragments = []
+            for tag, anchor, first_only in targets:
+                regions = find_regions(buf, tag, anchor, first_only)
+                if not regions:
+                    fragments = None
+                    break
+                fragments.extend(regions)
+
+    if fragments is None:
+        # Anchors missing -> parse the whole page as before
+        with open(filepath, encoding="utf-8") as f:
+            return BeautifulSoup(f, "html.parser"), False
+
+    html = b"".join(fragments).decode("utf-8", errors="replace")
+    return BeautifulSoup(html, "html.parser"), True
+
+
+# Fragments read by extract_oddsportal_data.py
+oddsportal_targets = [
+    (b"div", re.compile(rb'data-testid="game-participants"'), True),
+    (b"div", re.compile(rb'data-testid="breadcrumbs-line"'), True),
+    (b"div", re.compile(rb'data-testid="game-time-item"'), True),
+    (b"div", re.compile(rb'data-testid="over-under-collapsed-row"'), False),
+]
+
+# BOOKMAKER_ODDS=1: the expanded per-bookmaker rows too. One anchor for both row
+# kinds keeps them in page order, so every bookmaker row follows its line's row.
+oddsportal_bookmaker_targets = oddsportal_targets[:3] + [
+    (b"div", re.compile(rb'data-testid="over-under-(?:collapsed|expanded)-row"'), False),
+]
+
+# Fragments read by extract_opta_data.py (class token must end at a quote or space)
+opta_targets = [
+    (b"table", re.compile(rb'class="[^"]*Opta-MatchHeader'), True),
+    (b"span", re.compile(rb'class="(?:[^"]*\s)?Opta-Date(?=["\s])'), True),
+    (b"span", re.compile(rb'class="(?:[^"]*\s)?Opta-Competition(?=["\s])'), True),
+]
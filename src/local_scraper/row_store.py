@@ -0,0 +1,146 @@
+# Importing required libraries
+import csv
+from array import array
+
+
+# === Compact columnar container for extraction results ===
+# Text columns are interned into one shared dictionary (team names appear as both
+# home and away) and stored as uint32 codes; odds are stored as doubles and
+# integers as int64, each with a null mask. Rows are read through small
+# __slots__ views, so code that indexes rows (row[6]) keeps working unchanged.
+
+# Column kinds per output file (same order as csv_header in the extractors)
+oddsportal_kinds = ["text", "text", "text", "text", "text", "text",
+                    "float", "float", "text", "int", "int"]
+opta_kinds = ["text", "text", "int", "int", "text", "text", "text", "text", "int", "int"]
+
+
+# === Read-only view on one row ===
+class RowView:
+    __slots__ = ("store", "i")
+
+    def __init__(self, store, i):
+        self.store = store
+        self.i = i
+
+    def __getitem__(self, j):
+        return self.store.value(self.i, j)
+
+    def __len__(self):
+        return len(self.store.header)
+
+    def __iter__(self):
+        for j in range(len(self.store.header)):
+            yield self.store.value(self.i, j)
+
+    def __repr__(self):
+        return f"RowView({list(self)})"
+
+
+class CompactRows:
+    def __init__(self, header, kinds):
+        self.header = list(header)
+        self.kinds = list(kinds)
+        self.strings = []    # code -> string
+        self.codes = {}      # string -> code
+        self.n_rows = 0
+
+        self.columns = []
+        self.nulls = []      # per numeric column: bytearray, 1 = missing
+        for kind in self.kinds:
+            if kind == "float":
+                self.columns.append(array("d"))
+            elif kind == "int":
+                self.columns.append(array("q"))
+            else:
+                self.columns.append(array("I"))
+            self.nulls.append(bytearray() if kind != "text" else None)
+
+        # Original text of missing numeric values ("-", "NA"), so output is unchanged
+        self.null_text = {}
+
+    # --- Dictionary encoding ---
+    def intern(self, value):
+        value = "" if value is None else str(value)
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.strings)
+            self.codes[value] = code
+            self.strings.append(value)
+        return code
+
+    # --- Add one row (list of strings/numbers, same order as header) ---
+    def append(self, row):
+        i = self.n_rows
+        for j, (kind, value) in enumerate(zip(self.kinds, row)):
+            if kind == "text":
+                self.columns[j].append(self.intern(value))
+                continue
+
+            try:
+                number = float(value) if kind == "float" else int(value)
+                missing = 0
+            except (TypeError, ValueError):
+                number, missing = 0, 1
+                self.null_text[(i, j)] = self.intern(value)
+            self.columns[j].append(number)
+            self.nulls[j].append(missing)
+        self.n_rows += 1
+
+    # --- Access ---
+    def value(self, i, j):
+        if self.kinds[j] == "text":
+            return self.strings[self.columns[j][i]]
+        if self.nulls[j][i]:
+            return self.strings[self.null_text[(i, j)]]
+        return self.columns[j][i]
+
+    def __len__(self):
+        return self.n_rows
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.n_rows
+        if not 0 <= i < self.n_rows:
+            raise IndexError(i)
+        return RowView(self, i)
+
+    def __iter__(self):
+        for i in range(self.n_rows):
+            yield RowView(self, i)
+
+    def __bool__(self):
+        return self.n_rows > 0
+
+    # --- Output ---
+    def write_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            for i in range(self.n_rows):
+                writer.writerow([self.value(i, j) for j in range(len(self.header))])
+
+    def write_parquet(self, path):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            print("pyarrow not installed, skipping Parquet output")
+            return
+        pq.write_table(self.to_arrow_table(), path)
+
+    def to_arrow_table(self):
+        import pyarrow as pa
+
+        # Text columns go out dictionary-encoded, numeric columns with their null mask
+        dictionary = pa.array(self.strings, type=pa.string())
+        columns = {}
+        for j, name in enumerate(self.header):
+            kind = self.kinds[j]
+            if kind == "text":
+                indices = pa.array(self.columns[j], type=pa.uint32())
+                columns[name] = pa.DictionaryArray.from_arrays(indices, dictionary)
+            else:
+                values = [None if m else v for v, m in zip(self.columns[j], self.nulls[j])]
+                pa_type = pa.float64() if kind == "float" else pa.int64()
+                columns[name] = pa.array(values, type=pa_type)
+        return pa.table(columns)
@@ -0,0 +1,93 @@
+# Importing required libraries
+import csv
+import json
+from collections import Counter
+
+
+# === Helpers used by the rules ===
+def is_missing(value):
+    # "-" is how OddsPortal shows an unquoted side
+    return value is None or str(value).strip() in ("", "NA", "-")
+
+def as_odd(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# === Rules for OddsPortal rows ===
+# row: [Filename, HomeTeam, AwayTeam, Competition, KickoffRaw, Market, HomeOdd, AwayOdd, ...]
+def oddsportal_rules(min_overround=0.98, max_overround=1.30):
+    def one_sided(row):
+        return is_missing(row[6]) != is_missing(row[7])
+
+    def non_numeric(row):
+        return any(not is_missing(v) and as_odd(v) is None for v in (row[6], row[7]))
+
+    def out_of_range(row):
+        return any(as_odd(v) is not None and as_odd(v) <= 1.0 for v in (row[6], row[7]))
+
+    def implausible_overround(row):
+        home, away = as_odd(row[6]), as_odd(row[7])
+        if home is None or away is None or home <= 1.0 or away <= 1.0:
+            return False
+        overround = 1 / home + 1 / away
+        return not (min_overround <= overround <= max_overround)
+
+    return [
+        ("missing_team",          lambda row: is_missing(row[1]) or is_missing(row[2])),
+        ("missing_kickoff",       lambda row: is_missing(row[4])),
+        ("unknown_competition",   lambda row: row[3] == "Unknown"),
+        ("missing_market",        lambda row: is_missing(row[5])),
+        ("no_odds",               lambda row: is_missing(row[6]) and is_missing(row[7])),
+        ("one_sided_market",      one_sided),
+        ("non_numeric_odds",      non_numeric),
+        ("odds_out_of_range",     out_of_range),
+        ("implausible_overround", implausible_overround),
+    ]
+
+
+# === Rules for Opta rows ===
+# row: [HomeTeam, AwayTeam, HomeGoals, AwayGoals, KickoffTimeRaw, Competition, Filename, ...]
+def opta_rules():
+    def bad_score(row):
+        return any(not str(v).strip().isdigit() for v in (row[2], row[3]))
+
+    return [
+        ("missing_team",        lambda row: is_missing(row[0]) or is_missing(row[1])),
+        ("missing_score",       bad_score),
+        ("missing_kickoff",     lambda row: is_missing(row[4])),
+        ("unknown_competition", lambda row: row[5] == "Unknown"),
+    ]
+
+
+# === Streaming validator: good rows pass, bad rows go to the quarantine file ===
+class RowValidator:
+    def __init__(self, rules, quarantine_path, header):
+        self.rules = rules
+        self.counts = Counter()
+        self.quarantine_path = quarantine_path
+        self.f = open(quarantine_path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(header + ["Reasons"])
+
+    def accept(self, row):
+        self.counts["rows_checked"] += 1
+        reasons = [code for code, failed in self.rules if failed(row)]
+        if not reasons:
+            self.counts["rows_passed"] += 1
+            return True
+
+        self.counts["rows_quarantined"] += 1
+        for code in reasons:
+            self.counts[code] += 1
+        self.writer.writerow(list(row) + [";".join(reasons)])
+        return False
+
+    def close(self, stats_path=None):
+        self.f.close()
+        if stats_path:
+            with open(stats_path, "w", encoding="utf-8") as f:
+                json.dump(dict(self.counts), f, indent=2)
+        print("Data quality:", dict(self.counts))
@@ -16,6 +16,99 @@ from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import random
 import hashlib
 import csv
+from concurrent.futures import ThreadPoolExecutor
+
+
+# === Helper: read one worksheet as parallel row-range shards ===
+def read_sheet_sharded(ws, n_shards=4):
+    # Row count from column A only (one cheap call), then split into whole-row
+    # ranges ("1:250"), so columns right of the header (e.g. unnamed lease
+    # columns) are not cut off
+    n_rows = len(ws.col_values(1))
+    shard_size = max(1, -(-n_rows // n_shards))
+    ranges = [f"{start}:{min(start + shard_size - 1, n_rows)}"
+              for start in range(1, n_rows + 1, shard_size)]
+
+    with ThreadPoolExecutor(max_workers=n_shards) as pool:
+        shards = list(pool.map(ws.get, ranges))
+
+    # Shards come back in range order; pad every row (header included) to the longest one
+    rows = [list(row) for shard in shards for row in shard]
+    width = max((len(row) for row in rows), default=0)
+    for row in rows:
+        row.extend([""] * (width - len(row)))
+    return rows
+
+
+# === Helper: memoised link hashing (cache persisted across runs) ===
+hash_cache_path = "../../data/cache/link_hashes.csv"
+
+def load_hash_cache(path):
+    cache = {}
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for link, hashed_id in csv.reader(f):
+                cache[link] = hashed_id
+    return cache
+
+def save_hash_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(cache.items())
+
+def hash_links(links, cache):
+    # Hash each distinct unseen link once, then map the whole column
+    for link in set(links) - cache.keys():
+        cache[link] = hashlib.sha256(link.encode("utf-8")).hexdigest()[:24]
+    return [cache[link] for link in links]
+
+
+# === Helper: cast columns to their schema type ("" -> None for floats, 0 for counts) ===
+def type_rows(data, types):
+    header, rows = data[0], data[1:]
+    typed_rows = []
+    for row in rows:
+        typed = list(row)
+        for col, kind in types.items():
+            # Rows narrower than the schema keep what they have
+            if col >= len(typed):
+                continue
+            value = typed[col].strip()
+            try:
+                if kind == "float":
+                    typed[col] = float(value) if value else None
+                else:
+                    typed[col] = int(value) if value else 0
+            except ValueError:
+                typed[col] = None
+        typed_rows.append(typed)
+    return header, typed_rows
+
+
+def write_typed_csv(path, header, typed_rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        # None is written as an empty field (read as NA by readr)
+        writer.writerows(typed_rows)
+
+
+# === Helper: Parquet output (optional, needs pyarrow) ===
+def write_parquet(path, header, typed_rows, types):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("pyarrow not installed, skipping Parquet output")
+        return
+
+    pa_types = {"float": pa.float64(), "int": pa.int64()}
+    columns = {}
+    for col, name in enumerate(header):
+        name = name or f"col_{col + 1}"
+        values = [row[col] for row in typed_rows]
+        columns[name] = pa.array(values, type=pa_types.get(types.get(col), pa.string()))
+    pq.write_table(pa.table(columns), path)
 
 # Create output directory for saved HTML
 output_dir = "../../data/scraping_logs"
@@ -38,39 +131,75 @@ gc = gspread.authorize(creds)
 # Open target spreadsheet and worksheet
 sh = gc.open_by_key(sheet_id)
 
-# get to opta sheet
-ws_opta = sh.get_worksheet(0)
-opta_data = ws_opta.get_all_values()
-
-# get to oddsportal sheet
-ws_odds = sh.get_worksheet(2)
-oddsportal_data = ws_odds.get_all_values()
-
-# Transform scraping id oddsportal to match previous hashing
-header = oddsportal_data[0]
-rows = oddsportal_data[1:]
-
-# Optional: rename header of first column
-header[0] = "scrape_id"
-
-for i, row in enumerate(rows, start=1):  # start=1 because row 0 is header
-    original_value = row[0]              # whatever you hashed before (e.g. link)
-    hashed_id = hashlib.sha256(original_value.encode("utf-8")).hexdigest()[:24]
-    oddsportal_data[i][0] = hashed_id    # replace first column with hash
-
-
+# Export mode: "legacy" (untyped full-sheet dump) or "sharded" (parallel, typed, CSV + Parquet)
+export_mode = os.getenv("EXPORT_MODE", "legacy")
+n_shards = int(os.getenv("EXPORT_SHARDS", "4"))
 
 opta_path = os.path.join(output_dir, "opta_database.csv")
 odds_path = os.path.join(output_dir, "oddsportal_database.csv")
 
-with open(opta_path, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerows(opta_data)
-
-with open(odds_path, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    writer.writerows(oddsportal_data)
-
-
-
-
+# ===== LEGACY MODE =====
+if export_mode != "sharded":
+
+    # get to opta sheet
+    ws_opta = sh.get_worksheet(0)
+    opta_data = ws_opta.get_all_values()
+
+    # get to oddsportal sheet
+    ws_odds = sh.get_worksheet(2)
+    oddsportal_data = ws_odds.get_all_values()
+
+    # Transform scraping id oddsportal to match previous hashing
+    header = oddsportal_data[0]
+    rows = oddsportal_data[1:]
+
+    # Optional: rename header of first column
+    header[0] = "scrape_id"
+
+    for i, row in enumerate(rows, start=1):  # start=1 because row 0 is header
+        original_value = row[0]              # whatever you hashed before (e.g. link)
+        hashed_id = hashlib.sha256(original_value.encode("utf-8")).hexdigest()[:24]
+        oddsportal_data[i][0] = hashed_id    # replace first column with hash
+
+    with open(opta_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerows(opta_data)
+
+    with open(odds_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerows(oddsportal_data)
+
+# ===== SHARDED MODE =====
+else:
+    ws_opta = sh.get_worksheet(0)
+    ws_odds = sh.get_worksheet(2)
+
+    # Read both worksheets as parallel range shards
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        opta_future = pool.submit(read_sheet_sharded, ws_opta, n_shards)
+        odds_future = pool.submit(read_sheet_sharded, ws_odds, n_shards)
+        opta_data = opta_future.result()
+        oddsportal_data = odds_future.result()
+
+    # Hash all OddsPortal links in one batch, reusing hashes from earlier runs
+    cache = load_hash_cache(hash_cache_path)
+    n_cached = len(cache)
+    hashes = hash_links([row[0] for row in oddsportal_data[1:]], cache)
+    save_hash_cache(hash_cache_path, cache)
+    print(f'Hashed {len(cache) - n_cached} new links ({n_cached} taken from cache)')
+
+    oddsportal_data[0][0] = "scrape_id"
+    for row, hashed_id in zip(oddsportal_data[1:], hashes):
+        row[0] = hashed_id
+
+    # Typed columns (0-based positions): float epoch timestamps, int error counts,
+    # float lease expiry; lease owner and season stay text
+    opta_types = {3: "float", 4: "int", 6: "float"}
+    odds_types = {3: "float", 5: "float", 6: "int", 8: "float"}
+
+    for data, types, path in [(opta_data, opta_types, opta_path),
+                              (oddsportal_data, odds_types, odds_path)]:
+        header, typed_rows = type_rows(data, types)
+        write_typed_csv(path, header, typed_rows)
+        write_parquet(path.replace(".csv", ".parquet"), header, typed_rows, types)
+        print(f'Exported {len(typed_rows)} rows to {path}')
@@ -15,45 +15,92 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import random
 import hashlib
+import sys
+
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from scrape_journal import ScrapeJournal, reconcile
+from browser_profile import create_driver, page_network_stats, print_network_stats
+from dom_extract import capture_page, js_extract_oddsportal
+from state_store import open_state_store
+from work_leases import LeaseManager
+from session_pacing import pacing_from_env
+from scrape_metrics import metrics_from_env, TimedStore, queue_depth_series
+from page_check import check_oddsportal, PageCheckStats
+from match_scheduler import MatchScheduler, Job, parse_errors
+from scrape_pipeline import ScrapePipeline
+from season_config import (selected_seasons, selected_competitions, competition_name,
+                           partition_dir, row_season, oddsportal_season_col)
 
 
 # === Helper: wait for CSS selector, track possible blocking ===
-def safe_wait_css(driver, css_selector, block_suspicions, max_suspicions=3, wait_time=10):
+def safe_wait_css(driver, css_selector, block_suspicions, pacing, wait_time=10):
+    start = time.time()
     try:
         WebDriverWait(driver, wait_time).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
         )
-        return True, 0, False  # success → reset suspicion counter
+        pacing.observe_wait(True, time.time() - start)
+        return True, 0, False  # success -> reset suspicion counter
     except TimeoutException:
         block_suspicions = block_suspicions + 1
+        pacing.observe_wait(False, time.time() - start)
         print(f'WARNING! Timeout waiting for selector: {css_selector}')
         print(f'WARNING! Current BLOCK suspicion count: {block_suspicions}')
 
-        if block_suspicions >= max_suspicions:
+        # Stop on repeated timeouts or a suspicion rate far above target
+        if pacing.should_stop():
             print('ERROR, Too many block suspicions -> STOPPING SESSION')
             return False, block_suspicions, True
 
-        sleep_seconds = random.uniform(8, 15)
+        # Back-off grows with the pace and with timeouts in a row
+        sleep_seconds = pacing.cooldown()
         print(f'Backing off for {sleep_seconds:.1f}s...')
         time.sleep(sleep_seconds)
 
         return False, block_suspicions, False
 
 
-# === Helper: increment per-link error counter in sheet ===
-def increment_error_count(ws, row_index, col_index=7):
-    cell_value = ws.cell(row_index, col_index).value
+# === Helper: expand every line so the per-bookmaker rows are in the saved page ===
+def expand_lines(driver, css_selector):
+    for row in driver.find_elements(By.CSS_SELECTOR, css_selector):
+        driver.execute_script("arguments[0].click();", row)
+        time.sleep(random.uniform(0.1, 0.3))
+
+
+# === Helper: increment per-link error counter in the state store ===
+# timeout=True: safe_wait_css already fed the timeout to the pacing controller
+def increment_error_count(store, row_index, pacing, col_index=7, timeout=False):
+    if not timeout:
+        pacing.record_error()
+    cell_value = store.get_cell(row_index, col_index)
     try:
         current = int(cell_value) if cell_value not in (None, "") else 0
     except ValueError:
         current = 0
-    ws.update_cell(row_index, col_index, current + 1)
+    store.update_cell(row_index, col_index, current + 1)
+
 
+# === Helper: captured page failed the check -> not saved, back in the retry queue ===
+def reject_page(db_index, match, market, reason):
+    print(f'WARNING! {market.upper()} page of {match} rejected before saving: {reason}')
+    page_checks.record(reason)
+    journal.rejected(match, market, reason)
+    increment_error_count(store, db_index, pacing)
+    scheduler.record_failure(db_index)
 
-# Create output directory for saved HTML
+
+# Create output directory for saved HTML (pages go to season=.../competition=... partitions)
 output_dir = "../../data/html/odds_portal"
 os.makedirs(output_dir, exist_ok=True)
 
+# Capture mode: "html" (page_source), "json" (fields extracted in the browser) or "both"
+capture_mode = os.getenv("CAPTURE_MODE", "html")
+capture_ext = "json" if capture_mode == "json" else "html"
+
+# BOOKMAKER_ODDS=1: expand all lines before capturing, for per-bookmaker extraction
+expand_bookmakers = os.getenv("BOOKMAKER_ODDS", "0") == "1"
+
 # === Connect to Google Sheet with relative paths ===
 env_path = '../../.env'
 env_folder = '../../'
@@ -61,22 +108,76 @@ load_dotenv(env_path)
 
 json_relative = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 sheet_id = os.getenv("SPREADSHEET_ID")
-json_full_path = os.path.join(env_folder, json_relative)
 
-# Build credentials and authorize gspread
-scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
-gc = gspread.authorize(creds)
-
-# Open target spreadsheet and worksheet
-sh = gc.open_by_key(sheet_id)
-ws = sh.get_worksheet(2)
-print("Success! Connected to:", sh.title)
-print("First row:", ws.row_values(1))
+# State-store backend: "sheet" (Google Sheet) or "local" (CSV stand-in for tests)
+backend = os.getenv("STATE_STORE", "sheet")
+
+sh = None
+if backend == "sheet":
+    json_full_path = os.path.join(env_folder, json_relative)
+
+    # Build credentials and authorize gspread
+    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+    creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
+    gc = gspread.authorize(creds)
+
+    # Open target spreadsheet
+    sh = gc.open_by_key(sheet_id)
+    print("Success! Connected to:", sh.title)
+
+# Open worksheet 2 (OddsPortal links)
+store = open_state_store(backend, sh=sh, worksheet_index=2)
+
+# Live telemetry (METRICS_PORT in .env); every state-store call is timed
+metrics = metrics_from_env("oddsportal")
+store = TimedStore(store, metrics)
+
+# === Leases: coordinate several scraper machines (cols H and I) ===
+scraper_id = os.getenv("SCRAPER_ID", "local")
+leases = LeaseManager(store, scraper_id, owner_col=8,
+                      lease_seconds=int(os.getenv("LEASE_SECONDS", "300")))
+leases.start_heartbeat()
+
+# === Scheduler: rank pending matches instead of a uniform random pick ===
+scheduler = MatchScheduler(base_cooldown=int(os.getenv("SCHED_COOLDOWN", "60")),
+                           max_errors=int(os.getenv("SCHED_MAX_ERRORS", "8")))
+
+# === Journal: reconcile pages saved on disk with the sheet before scraping ===
+journal = ScrapeJournal("../../data/journal/oddsportal_journal.jsonl")
+
+# Partition folder of every link: season=.../competition=...
+partition_of = {}
+
+expected = []
+for idx, row in enumerate(store.get_all_values()[1:], start=2):
+    odds_id = row[0]
+    h = hashlib.sha256(odds_id.encode()).hexdigest()[:24]
+    part = partition_dir(output_dir, row_season(row, oddsportal_season_col), row[1])
+    partition_of[odds_id] = part
+    if row[2].strip() == "":
+        expected.append((odds_id, "ou", idx, 3, f'{part}/ou_{h}.{capture_ext}'))
+    if row[4].strip() == "":
+        expected.append((odds_id, "ah", idx, 5, f'{part}/ah_{h}.{capture_ext}'))
+
+n_reconciled = reconcile(journal, store, expected)
+print(f'Reconciled {n_reconciled} saved pages without fetching them again')
+
+# === Pipeline: writing files and state updates run behind the browser ===
+# PIPELINE_DEPTH = pages that may wait in each queue (0 = everything inline)
+def page_path_root(link, market):
+    h = hashlib.sha256(link.encode()).hexdigest()[:24]
+    part = partition_of[link]
+    os.makedirs(part, exist_ok=True)
+    return f'{part}/{market}_{h}'
+
+pipeline = ScrapePipeline(journal, store, leases, page_path_root,
+                          depth=int(os.getenv("PIPELINE_DEPTH", "4")))
 
 # === Selenium setup ===
 service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
+# Browser profile: "full" (visible, loads everything) or "lean" (headless, blocks unneeded resources)
+browser_profile = os.getenv("BROWSER_PROFILE", "full")
+driver = create_driver(service, browser_profile, network_stats=True)
 
 base_url = 'https://www.oddsportal.com'
 
@@ -92,18 +193,25 @@ accept_btn = wait.until(
 )
 accept_btn.click()
 
-# Pick random batch size for this session
-batch_size = random.choice(range(20, 41))
+# Session length and pacing adapt to timeouts, wait latency and errors
+# (PACING_TARGET / PACING_WINDOW / SESSION_MAX, decisions logged for tuning)
+pacing = pacing_from_env("../../data/logs/pacing_oddsportal.jsonl", metrics=metrics)
+batch_size = pacing.session_size
+page_checks = PageCheckStats(metrics=metrics)
 print(f'Scraping {batch_size} matches this session...')
 
 # Global suspicion counter
 block_suspicions = 0
 
+# Competitions and seasons we scrape (COMPETITIONS / SEASONS in .env)
+comps = selected_competitions()
+seasons = selected_seasons()
+
 # === Main scraping loop ===
 while batch_size > 0:
 
     population = []
-    rows = ws.get_all_values()[1:]  # all rows, skip header
+    rows = store.get_all_values()[1:]  # all rows, skip header
 
     # Build population of matches where OU or AH is not yet done
     for idx, row in enumerate(rows, start=2):
@@ -111,72 +219,117 @@ while batch_size > 0:
         status = row[2]     # OU status (col C)
         odds_id = row[0]
         status_ah = row[4]  # AH status (col E)
+        errors = parse_errors(row[6]) if len(row) > 6 else 0  # error count (col G)
+        season = row_season(row, oddsportal_season_col)       # season (col J)
+
+        if competition_name(competition) not in comps or season not in seasons:
+            continue
 
-        if status.strip() == "" or status_ah.strip() == "":
-            population.append((idx, odds_id))
+        # Skip rows another scraper holds a live lease on, or still in our pipeline
+        if not leases.is_available(row) or pipeline.busy(idx):
+            continue
+
+        pending = tuple(m for m, st in (("ou", status), ("ah", status_ah)) if st.strip() == "")
+        if pending:
+            partition_of[odds_id] = partition_dir(output_dir, season, competition)
+            population.append(Job(idx, odds_id, competition, errors, pending, season))
 
     # Nothing left to scrape
+    # Pending work per competition and market for the telemetry endpoint
+    metrics.set_all("scraper_queue_depth", queue_depth_series(population, competition_name))
+
     if not population:
         print("No remaining links.. Aborting...")
         break
 
-    # Randomly pick a match from population
-    match_to_scrape = random.choice(population)
-    db_index = match_to_scrape[0]
-    link_to_scrape = match_to_scrape[1]
-    print(f'Scraping following link: {base_url}{link_to_scrape}, with db_index of {db_index}...')
-
-    # ==== OVER/UNDER ====
-    driver.get(f'{base_url}{link_to_scrape}#over-under;2')
-    timestamp_ou = time.time()
-
-    css_odds_over_under = 'div[data-testid="over-under-collapsed-row"]'
-
-    # Wait for OU section to exist (any provider)
-    success, block_suspicions, should_stop = safe_wait_css(
-        driver=driver,
-        css_selector=css_odds_over_under,
-        block_suspicions=block_suspicions
-    )
-    if should_stop:
-        increment_error_count(ws, db_index)
-        break
-    if not success:
-        increment_error_count(ws, db_index)
+    # Rank the population (backlog, errors, page-load value) and claim the best free one
+    ranked = scheduler.order(population)
+    if not ranked:
+        print("All remaining links are cooling down after errors, waiting...")
+        time.sleep(random.uniform(10, 20))
         continue
 
-    # Switch to classic bookies
-    classic_bookies = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="classic"]')
-    classic_bookies.click()
-    time.sleep(random.uniform(0.5, 1.25))
-
-    # Wait again for OU rows under classic bookies
-    success, block_suspicions, should_stop = safe_wait_css(
-        driver=driver,
-        css_selector=css_odds_over_under,
-        block_suspicions=block_suspicions
-    )
-    if should_stop:
-        increment_error_count(ws, db_index)
-        break
-    if not success:
-        increment_error_count(ws, db_index)
+    match_to_scrape = leases.claim(ranked, shuffle=False)
+    if match_to_scrape is None:
+        time.sleep(random.uniform(2, 5))
         continue
+    db_index = match_to_scrape.db_index
+    link_to_scrape = match_to_scrape.link
+    ou_pending = "ou" in match_to_scrape.pending
+    ah_pending = "ah" in match_to_scrape.pending
+    print(f'Scraping following link: {base_url}{link_to_scrape}, with db_index of {db_index}...')
+
+    # ==== OVER/UNDER (skipped when already finished) ====
+    if ou_pending:
+        journal.intent(link_to_scrape, "ou")
+        driver.get(f'{base_url}{link_to_scrape}#over-under;2')
+        timestamp_ou = time.time()
 
-    # Save OU HTML
-    html_content = driver.page_source
-    h = hashlib.sha256(link_to_scrape.encode()).hexdigest()[:24]
-    filename = f'{output_dir}/ou_{h}.html'
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+        css_odds_over_under = 'div[data-testid="over-under-collapsed-row"]'
 
-    # Mark OU as done in sheet (cols C and D)
-    ws.update_cell(db_index, 3, "done")
-    ws.update_cell(db_index, 4, timestamp_ou)
+        # Wait for OU section to exist (any provider)
+        success, block_suspicions, should_stop = safe_wait_css(
+            driver=driver,
+            css_selector=css_odds_over_under,
+            block_suspicions=block_suspicions,
+            pacing=pacing
+        )
+        if should_stop:
+            increment_error_count(store, db_index, pacing, timeout=True)
+            break
+        if not success:
+            increment_error_count(store, db_index, pacing, timeout=True)
+            scheduler.record_failure(db_index)
+            pipeline.release(db_index)
+            continue
+
+        # Switch to classic bookies
+        classic_bookies = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="classic"]')
+        classic_bookies.click()
+        pacing.pause(0.5, 1.25)
+
+        # Wait again for OU rows under classic bookies
+        success, block_suspicions, should_stop = safe_wait_css(
+            driver=driver,
+            css_selector=css_odds_over_under,
+            block_suspicions=block_suspicions,
+            pacing=pacing
+        )
+        if should_stop:
+            increment_error_count(store, db_index, pacing, timeout=True)
+            break
+        if not success:
+            increment_error_count(store, db_index, pacing, timeout=True)
+            scheduler.record_failure(db_index)
+            pipeline.release(db_index)
+            continue
+
+        if expand_bookmakers:
+            expand_lines(driver, css_odds_over_under)
+
+        # Capture OU page; the pipeline writes it and marks OU done (cols C and D)
+        capture = capture_page(driver, capture_mode, js_extract_oddsportal)
+        reason = check_oddsportal(capture)
+        if reason is not None:
+            reject_page(db_index, link_to_scrape, "ou", reason)
+            pipeline.release(db_index)
+            continue
+        page_checks.record(None)
+        pipeline.submit(db_index, link_to_scrape, "ou", capture, timestamp_ou, 3)
+        metrics.page(market="ou")
+        metrics.set("scraper_pipeline_queue_depth", pipeline.queue_depth())
+        print_network_stats(page_network_stats(driver), 'OU')
+
+    # ==== ASIAN HANDICAP (skipped when already finished) ====
+    if not ah_pending:
+        scheduler.record_success(db_index)
+        pipeline.release(db_index)
+        batch_size = pacing.page_done(batch_size)
+        continue
 
-    # ==== ASIAN HANDICAP ====
+    journal.intent(link_to_scrape, "ah")
     driver.get(f'{base_url}{link_to_scrape}#ah;2')
-    time.sleep(random.uniform(0.5, 1.25))
+    pacing.pause(0.5, 1.25)
     driver.refresh()
     timestamp_ah = time.time()
 
@@ -186,51 +339,72 @@ while batch_size > 0:
     success, block_suspicions, should_stop = safe_wait_css(
         driver=driver,
         css_selector=css_odds_over_under,
-        block_suspicions=block_suspicions
+        block_suspicions=block_suspicions,
+        pacing=pacing
     )
     if should_stop:
-        increment_error_count(ws, db_index)
+        increment_error_count(store, db_index, pacing, timeout=True)
         break
     if not success:
-        increment_error_count(ws, db_index)
+        increment_error_count(store, db_index, pacing, timeout=True)
+        scheduler.record_failure(db_index)
+        pipeline.release(db_index)
         continue
 
     # Switch to classic bookies
     classic_bookies = driver.find_element(By.CSS_SELECTOR, 'div[data-testid="classic"]')
     classic_bookies.click()
-    time.sleep(random.uniform(0.5, 1.25))
+    pacing.pause(0.5, 1.25)
 
     # Wait again for AH rows under classic bookies
     success, block_suspicions, should_stop = safe_wait_css(
         driver=driver,
         css_selector=css_odds_over_under,
-        block_suspicions=block_suspicions
+        block_suspicions=block_suspicions,
+        pacing=pacing
     )
     if should_stop:
-        increment_error_count(ws, db_index)
+        increment_error_count(store, db_index, pacing, timeout=True)
         break
     if not success:
-        increment_error_count(ws, db_index)
+        increment_error_count(store, db_index, pacing, timeout=True)
+        scheduler.record_failure(db_index)
+        pipeline.release(db_index)
         continue
 
-    time.sleep(random.uniform(0.5, 1.25))
+    pacing.pause(0.5, 1.25)
 
-    # Save AH HTML
-    html_content = driver.page_source
-    h = hashlib.sha256(link_to_scrape.encode()).hexdigest()[:24]
-    filename = f'{output_dir}/ah_{h}.html'
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    if expand_bookmakers:
+        expand_lines(driver, css_odds_over_under)
 
-    # Mark AH as done in sheet (cols E and F)
-    ws.update_cell(db_index, 5, "done")
-    ws.update_cell(db_index, 6, timestamp_ah)
+    # Capture AH page; the pipeline writes it and marks AH done (cols E and F)
+    capture = capture_page(driver, capture_mode, js_extract_oddsportal)
+    reason = check_oddsportal(capture)
+    if reason is not None:
+        reject_page(db_index, link_to_scrape, "ah", reason)
+        pipeline.release(db_index)
+        continue
+    page_checks.record(None)
+    pipeline.submit(db_index, link_to_scrape, "ah", capture, timestamp_ah, 5)
+    metrics.page(market="ah")
+    metrics.set("scraper_pipeline_queue_depth", pipeline.queue_depth())
+    print_network_stats(page_network_stats(driver), 'AH')
+    scheduler.record_success(db_index)
+    pipeline.release(db_index)
 
     # One match (OU + AH) done in this batch
-    batch_size = batch_size - 1
+    batch_size = pacing.page_done(batch_size)
+
+# Let the writer/state workers finish before closing the journal and leases
+pipeline.close()
+pacing.close()
+metrics.close()
+print(page_checks.summary())
+journal.close()
+leases.stop()
 
 # === Compute total scraping progress (OU + AH) ===
-final_sheet_after_scraping = ws.get_all_values()
+final_sheet_after_scraping = store.get_all_values()
 
 status_col = [row[2] for row in final_sheet_after_scraping[1:]]  # OU
 status_col_ = [row[4] for row in final_sheet_after_scraping[1:]]  # AH
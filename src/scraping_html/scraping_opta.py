@@ -15,6 +15,22 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 from selenium.common.exceptions import NoSuchElementException
 import random
+import sys
+import json
+
+# Shared helpers live in src/scraping_utils
+sys.path.append('../scraping_utils')
+from scrape_journal import ScrapeJournal, reconcile, atomic_write_text
+from browser_profile import create_driver, page_network_stats, print_network_stats
+from dom_extract import capture_page, write_capture, js_extract_opta
+from state_store import open_state_store
+from work_leases import LeaseManager
+from session_pacing import pacing_from_env
+from scrape_metrics import metrics_from_env, TimedStore, queue_depth_series
+from page_check import check_opta, PageCheckStats
+from match_scheduler import MatchScheduler, Job, parse_errors
+from season_config import (selected_seasons, selected_competitions, partition_dir,
+                           row_season, opta_season_col)
 
 # === Helper function opta cookies ===
 
@@ -54,44 +70,113 @@ def accept_cookies_if_present_opta(driver):
 
 # === Helper function block suspicion abort ===
 
-def safe_wait_css(driver, css_selector, block_suspicions, max_suspicions = 3, wait_time = 10):
+def safe_wait_css(driver, css_selector, block_suspicions, pacing, wait_time=10):
+    start = time.time()
     try:
         WebDriverWait(driver, wait_time).until(
             EC.presence_of_element_located((By.CSS_SELECTOR, css_selector))
         )
-        return True, 0, False
-    
+        pacing.observe_wait(True, time.time() - start)
+        return True, 0, False  # success -> reset suspicion counter
     except TimeoutException:
         block_suspicions = block_suspicions + 1
+        pacing.observe_wait(False, time.time() - start)
         print(f'WARNING! Timeout waiting for selector: {css_selector}')
-        print(f'WARNING! Currrent BLOCK suspicion count: {block_suspicions}')
+        print(f'WARNING! Current BLOCK suspicion count: {block_suspicions}')
 
-        if block_suspicions >= max_suspicions:
+        # Stop on repeated timeouts or a suspicion rate far above target
+        if pacing.should_stop():
             print('ERROR, Too many block suspicions -> STOPPING SESSION')
             return False, block_suspicions, True
-        
-        sleep_seconds = random.uniform(8,15)
+
+        # Back-off grows with the pace and with timeouts in a row
+        sleep_seconds = pacing.cooldown()
         print(f'Backing off for {sleep_seconds:.1f}s...')
         time.sleep(sleep_seconds)
 
         return False, block_suspicions, False
 
+# === Helper function to open the fixture list of a competition in a season ===
+def open_competition(driver, url, competition, season):
+    driver.get(url)
+    time.sleep(5)
+    accept_cookies_if_present_opta(driver=driver)
+
+    # Redirect to competition page
+    href = driver.find_element(By.LINK_TEXT, competition)
+    href.click()
+
+    # Click the stats page link
+    stats_ref = driver.find_element(By.LINK_TEXT, "Opta Player Stats")
+    stats_ref.click()
+    time.sleep(5)
+
+    # Select the season
+    select = Select(driver.find_element(By.ID, "season-select"))
+    select.select_by_visible_text(season)
+    time.sleep(5)   # Wait for whole page to load
+
+
+# === Helpers for direct (deep-link) navigation to match pages ===
+# The first match opened from a fixture list tells us the match-page URL: if it
+# contains the opta id, the id is swapped for a placeholder and later matches are
+# opened with driver.get() instead of list -> click -> back.
+def learn_match_url_template(current_url, list_url, opta_id):
+    if current_url == list_url or opta_id not in current_url:
+        return None
+    escaped = current_url.replace("{", "{{").replace("}", "}}")
+    return escaped.replace(opta_id, "{opta_id}")
+
+def load_match_url_template(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f).get("template")
+
+def save_match_url_template(path, template):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_text(path, json.dumps({"template": template}))
+
+def drop_match_url_template(path):
+    # A template that keeps failing must not be loaded again by the next run
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# === Helper function to collapse an expanded fixture (stay on the list page) ===
+def collapse_fixture(driver, opta_id, stats_element, wait_time=10):
+    try:
+        match_element = driver.find_element(By.CSS_SELECTOR, f'[data-match="{opta_id}"]')
+        match_element.find_element(By.CLASS_NAME, 'Opta-Divider').click()
+        WebDriverWait(driver, wait_time).until(EC.staleness_of(stats_element))
+        return True
+    except (NoSuchElementException, TimeoutException):
+        return False
+
+
 # === Helper function to keep track of potential errors per link ===
-def increment_error_count(ws, row_index, col_index=5):
-    cell_value = ws.cell(row_index, col_index).value
+# timeout=True: safe_wait_css already fed the timeout to the pacing controller
+def increment_error_count(store, row_index, pacing, col_index=5, timeout=False):
+    if not timeout:
+        pacing.record_error()
+    cell_value = store.get_cell(row_index, col_index)
     try:
         current = int(cell_value) if cell_value not in (None, "") else 0
     except ValueError:
         current = 0  
 
     new_value = current + 1
-    ws.update_cell(row_index, col_index, new_value)
+    store.update_cell(row_index, col_index, new_value)
 
 
-# Creating output directory
+# Creating output directory (pages go to season=.../competition=... partitions below it)
 output_dir = "../../data/html"
 os.makedirs(output_dir, exist_ok=True)
 
+# Capture mode: "html" (page_source), "json" (fields extracted in the browser) or "both"
+capture_mode = os.getenv("CAPTURE_MODE", "html")
+capture_ext = "json" if capture_mode == "json" else "html"
+
 # === Connecting to our scraping match id status database ===
 
 # Load .env file
@@ -103,60 +188,96 @@ load_dotenv(env_path)
 json_relative = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
 sheet_id = os.getenv("SPREADSHEET_ID")
 
-# Create filepath of Google API JSON key
-json_full_path = os.path.join(env_folder, json_relative)
+# State-store backend: "sheet" (Google Sheet) or "local" (CSV stand-in for tests)
+backend = os.getenv("STATE_STORE", "sheet")
 
-#  Build credentials
-scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
+sh = None
+if backend == "sheet":
+    # Create filepath of Google API JSON key
+    json_full_path = os.path.join(env_folder, json_relative)
 
-# Authorize gspread
-gc = gspread.authorize(creds)
+    #  Build credentials
+    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
+    creds = Credentials.from_service_account_file(json_full_path, scopes=scopes)
 
-# Open spreadsheet
-sh = gc.open_by_key(sheet_id)
-ws = sh.sheet1
-print("Success! Connected to:", sh.title)
-print("First row:", ws.row_values(1))
+    # Authorize gspread
+    gc = gspread.authorize(creds)
+
+    # Open spreadsheet
+    sh = gc.open_by_key(sheet_id)
+    print("Success! Connected to:", sh.title)
+
+# Open worksheet 0 (Opta match ids)
+store = open_state_store(backend, sh=sh, worksheet_index=0)
+
+# Live telemetry (METRICS_PORT in .env); every state-store call is timed
+metrics = metrics_from_env("opta")
+store = TimedStore(store, metrics)
 
 # Make sure status column has a header
-ws.update([['status']], "C1")
+store.update_cell(1, 3, "status")
+
+# === Leases: coordinate several scraper machines (cols F and G) ===
+scraper_id = os.getenv("SCRAPER_ID", "local")
+leases = LeaseManager(store, scraper_id, owner_col=6,
+                      lease_seconds=int(os.getenv("LEASE_SECONDS", "300")))
+leases.start_heartbeat()
+
+# === Scheduler: rank pending matches instead of a uniform random pick ===
+# Switching competition costs extra page loads (competition, stats and season pages)
+scheduler = MatchScheduler(base_cooldown=int(os.getenv("SCHED_COOLDOWN", "60")),
+                           max_errors=int(os.getenv("SCHED_MAX_ERRORS", "8")),
+                           switch_cost=int(os.getenv("SCHED_SWITCH_COST", "3")))
+
+# === Journal: reconcile pages saved on disk with the sheet before scraping ===
+journal = ScrapeJournal("../../data/journal/opta_journal.jsonl")
+
+expected = []
+for idx, row in enumerate(store.get_all_values()[1:], start=2):
+    if len(row) < 3 or row[2].strip() == "":
+        part = partition_dir(output_dir, row_season(row, opta_season_col), row[1])
+        expected.append((row[0], "opta", idx, 3, f'{part}/{row[0]}.{capture_ext}'))
+
+n_reconciled = reconcile(journal, store, expected)
+print(f'Reconciled {n_reconciled} saved pages without fetching them again')
 
 # Setting up Chrome WebDriver with WebDriver Manager using Service
 service = Service(ChromeDriverManager().install())
-driver = webdriver.Chrome(service=service)
+# Browser profile: "full" (visible, loads everything) or "lean" (headless, blocks unneeded resources)
+browser_profile = os.getenv("BROWSER_PROFILE", "full")
+driver = create_driver(service, browser_profile, network_stats=True)
 
 # Starting url
 url = 'https://optaplayerstats.statsperform.com/en_GB/soccer/competitions'
 
 
-# Select competition
-comps = ['Premier League', 'Bundesliga', 'Primera División', 'Ligue 1', 'Serie A', 'UEFA Champions League', 'UEFA Europa League']
-
-selected_comp = random.choice(comps)
+# Competitions and seasons we scrape (COMPETITIONS / SEASONS in .env);
+# the session moves between them as the scheduler decides
+comps = selected_competitions()
+seasons = selected_seasons()
 
-# Access url in selenium
-driver.get(url)
-time.sleep(5)
-accept_cookies_if_present_opta(driver=driver)
+# (competition, season) whose fixture list is currently open (none yet)
+current_comp = None
 
-# Redirect to competition page
-href = driver.find_element(By.LINK_TEXT, selected_comp)
-href.click()
+# Navigation mode: "deeplink" (learn the match URL, then open matches directly;
+# fixture list + click until it is known) or "click" (always list -> click -> back)
+nav_mode = os.getenv("OPTA_NAV", "deeplink")
+template_path = "../../data/cache/opta_match_url.json"
+url_template = load_match_url_template(template_path) if nav_mode == "deeplink" else None
+deep_link_failures = 0
 
-# Click the stats page link
-stats_ref = driver.find_element(By.LINK_TEXT, "Opta Player Stats")
-stats_ref.click()
-time.sleep(5)
+# Fixture expanded in place on the current list page: (opta id, stats element)
+expanded = None
 
-# Select the 24/25 season
-select = Select(driver.find_element(By.ID, "season-select"))
-select.select_by_visible_text("2024/2025")
-time.sleep(5)   # Wait for whole page to load
+# Deep links do not need the fixture list, so switching competition is free
+if url_template is not None:
+    scheduler.switch_cost = 0
 
-
-# Pick batch size
-batch_size = random.choice(range(20,41))
+# Session length and pacing adapt to timeouts, wait latency and errors
+# (PACING_TARGET / PACING_WINDOW / SESSION_MAX, decisions logged for tuning)
+pacing = pacing_from_env("../../data/logs/pacing_opta.jsonl", metrics=metrics)
+batch_size = pacing.session_size
+page_checks = PageCheckStats(metrics=metrics)
 print(f'Scraping {batch_size} matches this session...')
 
 # Block suspicion counter
@@ -166,95 +287,188 @@ while batch_size > 0:
 
     population = []
 
-    rows = ws.get_all_values()[1:]  # skip header
+    rows = store.get_all_values()[1:]  # skip header
 
     for idx, row in enumerate(rows, start=2):
         competition = row[1]
         status = row[2]
         opta_id = row[0]
+        errors = parse_errors(row[4]) if len(row) > 4 else 0   # error count (col E)
+
+        # Skip rows another scraper holds a live lease on
+        if not leases.is_available(row):
+            continue
+
+        season = row_season(row, opta_season_col)
 
-        if competition == selected_comp and status.strip() == "":
-            population.append((idx, opta_id))
+        if competition in comps and season in seasons and status.strip() == "":
+            population.append(Job(idx, opta_id, competition, errors, ("opta",), season))
 
     # == EMPTY POPULATION BREAK ==
+    # Pending work per competition and market for the telemetry endpoint
+    metrics.set_all("scraper_queue_depth", queue_depth_series(population))
+
     if not population:
-        print(f"No remaining links for: {selected_comp}")
+        print("No remaining links.. Aborting...")
         break
 
-    match_to_scrape = random.choice(population)
-    db_index = match_to_scrape[0]               # This is the idx
-    opta_id_to_scrape = match_to_scrape[1]      # This is the opta id
-    print(f'Scraping opta id {opta_id_to_scrape}, with db_index of {db_index}...')
-
-    # Define css search logic
-    css_match_overview = 'tbody[data-match]'
-    
-    # Call block suspicion function
-    success, block_suspicions, should_stop = safe_wait_css(
-        driver=driver,
-        css_selector=css_match_overview,
-        block_suspicions=block_suspicions
-    )
-    if should_stop:
-        break
-    if not success:
+    # Rank the population (backlog, errors, competition switches) and claim the best free one
+    ranked = scheduler.order(population, current=current_comp)
+    if not ranked:
+        print("All remaining links are cooling down after errors, waiting...")
+        time.sleep(random.uniform(10, 20))
         continue
 
+    match_to_scrape = leases.claim(ranked, shuffle=False)
+    if match_to_scrape is None:
+        time.sleep(random.uniform(2, 5))
+        continue
+    db_index = match_to_scrape.db_index               # This is the idx
+    opta_id_to_scrape = match_to_scrape.link          # This is the opta id
+    print(f'Scraping opta id {opta_id_to_scrape} ({match_to_scrape.competition}), with db_index of {db_index}...')
 
-    time.sleep(random.uniform(0.5, 1.25))
+    # Define css search logic
+    css_match_overview = 'tbody[data-match]'
+    css_match_stats = 'thead.Opta-Player-Stats'
 
-    # Find the corresponding match on the website
-    match_element = driver.find_element(By.CSS_SELECTOR,f'[data-match="{opta_id_to_scrape}"]')
-    v = match_element.find_element(By.CLASS_NAME, 'Opta-Divider')
-    v.click()
+    via_list = url_template is None
+    if not via_list:
+        # Open the match page directly
+        journal.intent(opta_id_to_scrape, "opta")
+        driver.get(url_template.format(opta_id=opta_id_to_scrape))
+        current_comp = None   # we are not on a fixture list any more
+        expanded = None
+    else:
+        # Collapse the fixture we expanded last time, so its stats table is gone
+        if expanded is not None and not collapse_fixture(driver, expanded[0], expanded[1]):
+            current_comp = None
+        expanded = None
+
+        # Open the fixture list of the match's competition if we are not on it yet
+        if (match_to_scrape.competition, match_to_scrape.season) != current_comp:
+            open_competition(driver, url, match_to_scrape.competition, match_to_scrape.season)
+            current_comp = (match_to_scrape.competition, match_to_scrape.season)
+
+        # Call block suspicion function
+        success, block_suspicions, should_stop = safe_wait_css(
+            driver=driver,
+            css_selector=css_match_overview,
+            block_suspicions=block_suspicions,
+            pacing=pacing
+        )
+        if should_stop:
+            break
+        if not success:
+            scheduler.record_failure(db_index)
+            leases.release(db_index)
+            current_comp = None   # reopen the fixture list on the next pick
+            continue
+
+        pacing.pause(0.5, 1.25)
+        list_url = driver.current_url
+
+        # Find the corresponding match on the website
+        journal.intent(opta_id_to_scrape, "opta")
+        match_element = driver.find_element(By.CSS_SELECTOR,f'[data-match="{opta_id_to_scrape}"]')
+        v = match_element.find_element(By.CLASS_NAME, 'Opta-Divider')
+        v.click()
 
     # Define the timestamp at which the link was accessed
     timestamp = time.time()
 
-    # Define css search logic
-    css_match_stats = 'thead.Opta-Player-Stats'
-    
     # Call block suspicion function
     success, block_suspicions, should_stop = safe_wait_css(
         driver=driver,
         css_selector=css_match_stats,
-        block_suspicions=block_suspicions
+        block_suspicions=block_suspicions,
+        pacing=pacing
     )
     if should_stop:
-        increment_error_count(ws, db_index)
+        increment_error_count(store, db_index, pacing, timeout=True)
         break
     if not success:
-        increment_error_count(ws, db_index)
-        # Go back to base_url
-        driver.back()
-        time.sleep(random.uniform(0.4, 1.2))
+        increment_error_count(store, db_index, pacing, timeout=True)
+        scheduler.record_failure(db_index)
+        leases.release(db_index)
+        if via_list:
+            # Go back to base_url
+            driver.back()
+            pacing.pause(0.4, 1.2)
+        else:
+            # A learned URL that keeps failing is dropped (back to list + click)
+            deep_link_failures = deep_link_failures + 1
+            if deep_link_failures >= 3:
+                print('WARNING! Direct match links keep failing, falling back to the fixture list')
+                url_template = None
+                drop_match_url_template(template_path)
+                scheduler.switch_cost = int(os.getenv("SCHED_SWITCH_COST", "3"))
         continue
+    deep_link_failures = 0
 
     # Add small human delay as well
-    time.sleep(random.uniform(0.7,1.5))
+    pacing.pause(0.7, 1.5)
+
+    # Collect page and check it before saving: block/consent/half-loaded pages go back to the retry queue
+    capture = capture_page(driver, capture_mode, js_extract_opta)
+    reason = check_opta(capture)
+    page_checks.record(reason)
+    if reason is not None:
+        print(f'WARNING! Page of opta id {opta_id_to_scrape} rejected before saving: {reason}')
+        journal.rejected(opta_id_to_scrape, "opta", reason)
+        increment_error_count(store, db_index, pacing)
+        scheduler.record_failure(db_index)
+        leases.release(db_index)
+        # Start from the fixture list again on the next pick
+        current_comp = None
+        expanded = None
+        continue
 
-    # Collect html
-    html_content = driver.page_source
-    
-    filename = f'{output_dir}/{opta_id_to_scrape}.html'
-    
-    # Write file
-    with open(filename, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    # Write file (atomic write, then journal before touching the sheet)
+    part = partition_dir(output_dir, match_to_scrape.season, match_to_scrape.competition)
+    os.makedirs(part, exist_ok=True)
+    filename = write_capture(f'{part}/{opta_id_to_scrape}', capture)
+    metrics.page(market="opta")
+    journal.saved(opta_id_to_scrape, "opta", filename, timestamp)
+    print_network_stats(page_network_stats(driver), 'Opta')
 
     # Update status of opta id
-    ws.update_cell(db_index, 3, "done")
-    ws.update_cell(db_index, 4, timestamp)
+    store.update_cell(db_index, 3, "done")
+    store.update_cell(db_index, 4, timestamp)
+    journal.recorded(opta_id_to_scrape, "opta")
+    scheduler.record_success(db_index)
+    leases.release(db_index)
     # Decrease count of batch size
-    batch_size = batch_size - 1
+    batch_size = pacing.page_done(batch_size)
+
+    if not via_list:
+        continue
+
+    # Learn the direct match URL from this page (deeplink mode)
+    if nav_mode == "deeplink" and url_template is None:
+        url_template = learn_match_url_template(driver.current_url, list_url, opta_id_to_scrape)
+        if url_template is not None:
+            save_match_url_template(template_path, url_template)
+            scheduler.switch_cost = 0
+            print(f'Learned direct match URL: {url_template}')
+            continue
+
+    if driver.current_url == list_url:
+        # Fixture expanded in place: stay on the list, collapse it before the next click
+        expanded = (opta_id_to_scrape, driver.find_element(By.CSS_SELECTOR, css_match_stats))
+    else:
+        # Go back to base_url
+        driver.back()
+        pacing.pause(0.4, 1.2)
 
-    # Go back to base_url
-    driver.back()
-    time.sleep(random.uniform(0.4, 1.2))
 
+pacing.close()
+metrics.close()
+print(page_checks.summary())
+journal.close()
+leases.stop()
 
 # Compute total OPTA scraping progress
-final_sheet_after_scraping = ws.get_all_values()
+final_sheet_after_scraping = store.get_all_values()
 
 # Extract status column (skip header)
 status_col = [row[2] for row in final_sheet_after_scraping[1:]]
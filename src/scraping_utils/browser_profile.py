@@ -0,0 +1,102 @@
+# Importing required libraries
+import os
+import json
+from selenium import webdriver
+
+# === Browser profiles ===
+# full:         visible Chrome, everything loaded (previous behaviour)
+# lean:         headless Chrome, unneeded resources blocked through CDP
+# visible_lean: visible Chrome, unneeded resources blocked (for debugging the block list)
+profiles = {
+    "full":         {"headless": False, "block": False},
+    "lean":         {"headless": True,  "block": True},
+    "visible_lean": {"headless": False, "block": True},
+}
+
+# URL patterns the odds rows and Opta player tables do not need.
+# Cookie consent (OneTrust, Usercentrics) is NOT blocked: the scripts click it.
+blocked_url_patterns = [
+    # images and fonts
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf",
+    # media
+    "*.mp4", "*.webm",
+    # ads and trackers
+    "*doubleclick.net*", "*googlesyndication.com*", "*googletagmanager.com*",
+    "*google-analytics.com*", "*adservice.google.*", "*scorecardresearch.com*",
+    "*criteo.*", "*taboola.com*", "*outbrain.com*", "*hotjar.com*",
+    "*facebook.net*", "*amazon-adsystem.com*", "*adnxs.com*", "*pubmatic.com*",
+    "*rubiconproject.com*", "*casalemedia.com*", "*quantserve.com*",
+]
+
+
+# === Build Chrome for a profile name (BROWSER_PROFILE in .env) ===
+# network_stats=True only for drivers whose page_network_stats are read: the
+# performance log costs CPU and memory while nobody drains it
+def create_driver(service, profile_name="full", network_stats=False):
+    profile = profiles[profile_name]
+
+    options = webdriver.ChromeOptions()
+    if profile["headless"]:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+
+    # Performance log is needed for the per-page network report
+    if network_stats:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    driver = webdriver.Chrome(service=service, options=options)
+
+    if profile["headless"]:
+        # Headless Chrome announces itself in the user agent; send the normal one
+        user_agent = driver.execute_cdp_cmd("Browser.getVersion", {})["userAgent"]
+        driver.execute_cdp_cmd("Network.setUserAgentOverride",
+                               {"userAgent": user_agent.replace("HeadlessChrome", "Chrome")})
+
+    if profile["block"]:
+        extra = [p for p in os.getenv("BLOCK_PATTERNS", "").split(",") if p]
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs",
+                               {"urls": blocked_url_patterns + extra})
+
+    return driver
+
+
+# === Per-page network report from the performance log ===
+# Reading the log also empties it, so every call covers the page(s) since the last call.
+# loadingFailed carries no byte count, so the bytes of a blocked request are summed
+# from its dataReceived chunks. Requests blocked by URL pattern are never sent (0 bytes);
+# only responses blocked after arrival (e.g. ORB/CORB) show up in blocked_bytes.
+def page_network_stats(driver):
+    stats = {"requests": 0, "bytes": 0, "blocked": 0, "blocked_bytes": 0}
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return stats
+
+    received = {}   # requestId -> encoded bytes received so far
+    for entry in entries:
+        message = json.loads(entry["message"])["message"]
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            stats["requests"] = stats["requests"] + 1
+        elif method == "Network.dataReceived":
+            request_id = params.get("requestId")
+            received[request_id] = received.get(request_id, 0) + int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFinished":
+            received.pop(params.get("requestId"), None)
+            stats["bytes"] = stats["bytes"] + int(params.get("encodedDataLength", 0))
+        elif method == "Network.loadingFailed":
+            partial = received.pop(params.get("requestId"), 0)
+            stats["bytes"] = stats["bytes"] + partial
+            if params.get("blockedReason"):
+                stats["blocked"] = stats["blocked"] + 1
+                stats["blocked_bytes"] = stats["blocked_bytes"] + partial
+    return stats
+
+
+def print_network_stats(stats, label=""):
+    print(f'[network] {label} requests: {stats["requests"]}, '
+          f'blocked (saved): {stats["blocked"]} ({stats.get("blocked_bytes", 0) / 1024:.0f} KB received before the block), '
+          f'transferred: {stats["bytes"] / 1024:.0f} KB')
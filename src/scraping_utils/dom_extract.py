@@ -0,0 +1,126 @@
+# Importing required libraries
+import json
+from scrape_journal import atomic_write_text
+
+# Shared JS: text of an element like BeautifulSoup get_text(strip=True)
+# (every text node stripped, then joined without separator)
+js_text_helper = """
+const txt = (el) => {
+    if (!el) return null;
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    const parts = [];
+    while (walker.nextNode()) {
+        const t = walker.currentNode.nodeValue.trim();
+        if (t) parts.push(t);
+    }
+    return parts.join('');
+};
+"""
+
+# === OddsPortal: same fields as extract_oddsportal_data.py ===
+js_extract_oddsportal = js_text_helper + """
+// Line label <p class="max-sm:!hidden"> (':' and '!' escaped for CSS)
+const labelSelector = 'p.max-sm\\\\:\\\\!hidden';
+const out = {home: "NA", away: "NA", competition: "Unknown", kickoff_raw: "NA", blocks: [], bookmakers: []};
+
+const participants = document.querySelector('div[data-testid="game-participants"]');
+if (participants) {
+    const host = participants.querySelector('div[data-testid="game-host"] p');
+    const guest = participants.querySelector('div[data-testid="game-guest"] p');
+    if (host) out.home = txt(host);
+    if (guest) out.away = txt(guest);
+}
+
+const crumbs = document.querySelectorAll('div[data-testid="breadcrumbs-line"] a');
+if (crumbs.length) out.competition = crumbs[crumbs.length - 1].textContent.trim();
+
+const timeblock = document.querySelector('div[data-testid="game-time-item"]');
+if (timeblock) {
+    const ps = timeblock.querySelectorAll('p');
+    if (ps.length === 3) out.kickoff_raw = txt(ps[1]).replace(/,/g, ' ') + txt(ps[2]);
+}
+
+for (const block of document.querySelectorAll('div[data-testid="over-under-collapsed-row"]')) {
+    const label = block.querySelector(labelSelector);
+    const odds = Array.from(block.querySelectorAll('p[data-testid="odd-container-default"]')).map(txt);
+    out.blocks.push([label ? txt(label) : "NA", odds]);
+}
+
+// Expanded lines: one [line, bookmaker, odds] per bookmaker row, in page order
+let line = "NA";
+for (const row of document.querySelectorAll('div[data-testid="over-under-collapsed-row"], div[data-testid="over-under-expanded-row"]')) {
+    if (row.getAttribute('data-testid') === 'over-under-collapsed-row') {
+        const label = row.querySelector(labelSelector);
+        line = label ? txt(label) : "NA";
+        continue;
+    }
+    const name = row.querySelector('p[data-testid="outrights-expanded-bookmaker-name"]');
+    const logo = row.querySelector('img[alt]');
+    const bookmaker = name ? txt(name) : (logo ? logo.getAttribute('alt').trim() : null);
+    if (!bookmaker) continue;
+    const odds = Array.from(row.querySelectorAll('div[data-testid="odd-container"] p')).map(txt);
+    out.bookmakers.push([line, bookmaker, odds]);
+}
+return JSON.stringify(out);
+"""
+
+# === Opta: same fields as extract_opta_data.py ===
+js_extract_opta = js_text_helper + """
+const out = {home_team: "NA", away_team: "NA", home_goals: "NA", away_goals: "NA",
+             kickoff_raw: "NA", competition: "Unknown"};
+
+const header = document.querySelector('table[class*="Opta-MatchHeader"]');
+if (header) {
+    for (const td of header.querySelectorAll('td.Opta-TeamName')) {
+        const classes = Array.from(td.classList);
+        if (classes.some(c => c.includes('Home'))) out.home_team = txt(td);
+        else if (classes.some(c => c.includes('Away'))) out.away_team = txt(td);
+    }
+    const scores = header.querySelectorAll('span[class*="Opta-Team-Score"]');
+    if (scores.length >= 1) out.home_goals = txt(scores[0]);
+    if (scores.length >= 2) out.away_goals = txt(scores[1]);
+}
+
+const date = document.querySelector('span.Opta-Date');
+if (date) out.kickoff_raw = txt(date);
+const comp = document.querySelector('span.Opta-Competition');
+if (comp) out.competition = txt(comp);
+return JSON.stringify(out);
+"""
+
+
+# === Run one extraction script in the browser and return the parsed dict ===
+def extract_at_source(driver, script):
+    return json.loads(driver.execute_script(script))
+
+
+# === Capture a page in memory according to the capture mode (browser side only) ===
+# capture_mode: "html" (page_source only), "json" (extracted fields only) or "both"
+def capture_page(driver, capture_mode, script):
+    capture = {"json": None, "html": None}
+    if capture_mode in ("json", "both"):
+        capture["json"] = extract_at_source(driver, script)
+    if capture_mode in ("html", "both"):
+        capture["html"] = driver.page_source
+    return capture
+
+
+# === Write a captured page to disk ===
+# Returns the path that marks the page as saved (html when written, else json).
+def write_capture(path_root, capture):
+    saved_path = None
+
+    if capture["json"] is not None:
+        saved_path = f'{path_root}.json'
+        atomic_write_text(saved_path, json.dumps(capture["json"], ensure_ascii=False))
+
+    if capture["html"] is not None:
+        saved_path = f'{path_root}.html'
+        atomic_write_text(saved_path, capture["html"])
+
+    return saved_path
+
+
+# === Persist a captured page according to the capture mode ===
+def save_capture(driver, path_root, capture_mode, script):
+    return write_capture(path_root, capture_page(driver, capture_mode, script))
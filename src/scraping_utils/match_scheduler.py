@@ -0,0 +1,86 @@
+# Importing required libraries
+import time
+import random
+from collections import Counter, namedtuple
+
+
+# One unit of pending work, built from a status-sheet row.
+# db_index comes first so LeaseManager.claim() can use it directly.
+#   pending -> markets still to scrape, e.g. ("ou", "ah") or ("opta",)
+#   season  -> "2024/2025"; backlog and switch cost are per (competition, season)
+Job = namedtuple("Job", ["db_index", "link", "competition", "errors", "pending", "season"],
+                 defaults=[None])
+
+
+# === Helper: error counter cell -> int ===
+def parse_errors(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+# === Priority scheduler: which pending match do we try next? ===
+# A job's score multiplies:
+#   - competition backlog   -> competitions with more pending work come first
+#   - page-load value       -> 1 / page loads needed to finish the match
+#                              (a match with only AH left beats one needing OU + AH)
+#   - error decay           -> 0.5 ** errors from the sheet, so links that keep
+#                              failing are tried less and less often
+#   - switch cost           -> jobs outside the page we are on cost extra loads
+# Jobs that failed in this session sit out an exponential cool-down.
+# The order is a weighted random draw, so sessions still do not follow a fixed pattern.
+class MatchScheduler:
+    def __init__(self, base_cooldown=60, max_errors=8, switch_cost=0):
+        self.base_cooldown = base_cooldown
+        self.max_errors = max_errors
+        self.switch_cost = switch_cost
+        self.failures = {}   # db_index -> (failures this session, last failure time)
+
+    # --- Session feedback ---
+    def record_failure(self, db_index, now=None):
+        now = time.time() if now is None else now
+        count, _ = self.failures.get(db_index, (0, 0))
+        self.failures[db_index] = (count + 1, now)
+
+    def record_success(self, db_index):
+        self.failures.pop(db_index, None)
+
+    def cooling_down(self, db_index, now):
+        if db_index not in self.failures:
+            return False
+        count, last = self.failures[db_index]
+        return now < last + self.base_cooldown * 2 ** (count - 1)
+
+    # --- Scoring ---
+    def score(self, job, backlog, max_backlog, current=None):
+        partition = (job.competition, job.season)
+        backlog_weight = backlog[partition] / max_backlog
+        load_value = 1 / max(len(job.pending), 1)
+        error_decay = 0.5 ** job.errors
+        switch = 1 / (1 + self.switch_cost) if current is not None and partition != current else 1
+        return backlog_weight * load_value * error_decay * switch
+
+    # --- Order candidates, best first (feed to LeaseManager.claim) ---
+    # current: (competition, season) of the page we are on, if any
+    def order(self, jobs, current=None, now=None):
+        now = time.time() if now is None else now
+        jobs = [job for job in jobs if not self.cooling_down(job.db_index, now)]
+
+        # Links past max_errors are only tried when nothing else is left
+        healthy = [job for job in jobs if job.errors < self.max_errors]
+        if healthy:
+            jobs = healthy
+        if not jobs:
+            return []
+
+        backlog = Counter((job.competition, job.season) for job in jobs)
+        max_backlog = max(backlog.values())
+
+        # Weighted random order: key = u ** (1 / score), highest first
+        keyed = []
+        for job in jobs:
+            score = max(self.score(job, backlog, max_backlog, current), 1e-12)
+            keyed.append((random.random() ** (1 / score), job))
+        keyed.sort(key=lambda pair: pair[0], reverse=True)
+        return [job for _, job in keyed]
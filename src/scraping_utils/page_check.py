@@ -0,0 +1,118 @@
+# Importing required libraries
+import re
+from collections import Counter
+
+
+# === Cheap sanity check of a captured page before it is saved and marked done ===
+# A page that passed safe_wait_css can still be a block/consent page, or have an
+# empty or half-loaded odds table. Such pages come out of extraction as "NA" rows
+# and had to be re-scraped by hand. The checks below only count byte patterns in
+# the captured HTML (no parse) or look at the in-browser JSON fields, so they add
+# well under a millisecond per page. A failing page is not saved; the scraper puts
+# the match back in the retry queue with the reason.
+
+# Text of bot-protection / block pages
+block_markers = re.compile(
+    r"cf-challenge|challenge-platform|Just a moment\.\.\.|Access Denied|captcha|"
+    r"unusual traffic|Request blocked|Too Many Requests",
+    re.IGNORECASE,
+)
+
+# Consent layers (only a problem when the content underneath is missing)
+consent_markers = re.compile(r'id="onetrust-banner-sdk"|id="qc-cmp2-container"|class="fc-consent-root"')
+
+# Smallest plausible match page; anything shorter is a stub or an error page
+min_html_bytes = 20000
+
+odds_row = re.compile(r'data-testid="over-under-collapsed-row"')
+odds_value = re.compile(r'data-testid="odd-container-default"[^>]*>(?:<[^>]+>)*\s*([0-9]+\.[0-9]+)')
+odds_teams = re.compile(r'data-testid="game-(?:host|guest)"')
+
+opta_header = re.compile(r'Opta-MatchHeader')
+opta_team = re.compile(r'Opta-TeamName')
+opta_stats = re.compile(r'Opta-Player-Stats')
+
+
+# === Helper: is this a float-looking odd ("1.95")? ===
+def is_price(text):
+    try:
+        float(text)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+# === OddsPortal ===
+# Returns None when the page looks complete, else a short reason code
+def check_oddsportal(capture):
+    html = capture.get("html")
+    if html is not None:
+        if len(html) < min_html_bytes:
+            return "empty_page"
+        n_rows = len(odds_row.findall(html))
+        if n_rows == 0:
+            if block_markers.search(html):
+                return "blocked"
+            if consent_markers.search(html):
+                return "consent_wall"
+            return "no_odds_rows"
+        if len(odds_teams.findall(html)) < 2:
+            return "no_teams"
+        # Partially loaded list: rows rendered but (almost) no prices in them
+        if len(odds_value.findall(html)) < n_rows:
+            return "empty_odds"
+
+    data = capture.get("json")
+    if data is not None:
+        if not data.get("blocks"):
+            return "no_odds_rows"
+        if data.get("home") in (None, "NA") or data.get("away") in (None, "NA"):
+            return "no_teams"
+        n_prices = sum(1 for _, odds in data["blocks"] for odd in odds if is_price(odd))
+        if n_prices < len(data["blocks"]):
+            return "empty_odds"
+    return None
+
+
+# === Opta ===
+def check_opta(capture):
+    html = capture.get("html")
+    if html is not None:
+        if len(html) < min_html_bytes:
+            return "empty_page"
+        if not opta_header.search(html):
+            if block_markers.search(html):
+                return "blocked"
+            if consent_markers.search(html):
+                return "consent_wall"
+            return "no_match_header"
+        if len(opta_team.findall(html)) < 2:
+            return "no_teams"
+        if not opta_stats.search(html):
+            return "no_player_stats"
+
+    data = capture.get("json")
+    if data is not None:
+        if data.get("home_team") in (None, "NA") or data.get("away_team") in (None, "NA"):
+            return "no_teams"
+    return None
+
+
+# === Per-session tally of rejected pages ===
+class PageCheckStats:
+    def __init__(self, metrics=None):
+        self.reasons = Counter()
+        self.passed = 0
+        self.metrics = metrics
+
+    def record(self, reason):
+        if reason is None:
+            self.passed += 1
+        else:
+            self.reasons[reason] += 1
+            if self.metrics is not None:
+                self.metrics.inc("scraper_pages_rejected_total", reason=reason)
+
+    def summary(self):
+        rejected = ", ".join(f"{reason}: {n}" for reason, n in self.reasons.most_common()) or "none"
+        return f'Page check: {self.passed} pages passed, rejected -> {rejected}'
@@ -0,0 +1,98 @@
+# Importing required libraries
+import os
+import json
+import time
+import threading
+
+
+# === Helper: crash-safe file write (temp file + atomic rename) ===
+def atomic_write_text(path, text):
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# === Append-only journal of intents and completions per (match, market) ===
+# Events per (match, market):
+#   intent   -> page load started
+#   saved    -> html written to disk (file + access timestamp)
+#   recorded -> status written to the state store
+#   rejected -> page failed the pre-save check (not saved, retried later)
+class ScrapeJournal:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.state = {}
+        self.lock = threading.Lock()   # the scrape pipeline appends from worker threads
+        self._replay()
+        self.f = open(path, "a", encoding="utf-8")
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A torn last line from a crash is ignored
+                    continue
+                key = (entry["match"], entry["market"])
+                record = self.state.setdefault(key, {})
+                record[entry["event"]] = entry
+
+    def _append(self, event, match, market, **fields):
+        entry = {"event": event, "match": match, "market": market, "ts": time.time()}
+        entry.update(fields)
+        with self.lock:
+            self.f.write(json.dumps(entry) + "\n")
+            self.f.flush()
+            os.fsync(self.f.fileno())
+            self.state.setdefault((match, market), {})[event] = entry
+
+    def intent(self, match, market):
+        self._append("intent", match, market)
+
+    def saved(self, match, market, file, timestamp):
+        self._append("saved", match, market, file=file, timestamp=timestamp)
+
+    def recorded(self, match, market):
+        self._append("recorded", match, market)
+
+    def rejected(self, match, market, reason):
+        self._append("rejected", match, market, reason=reason)
+
+    def is_saved(self, match, market):
+        return "saved" in self.state.get((match, market), {})
+
+    def is_recorded(self, match, market):
+        return "recorded" in self.state.get((match, market), {})
+
+    def close(self):
+        self.f.close()
+
+
+# === Reconcile saved html files with the state store on restart ===
+# expected: list of (match, market, db_index, status_col, file_path) for rows still pending
+# Finished pages found on disk are recorded as done without fetching them again.
+def reconcile(journal, store, expected):
+    n_fixed = 0
+    for match, market, db_index, status_col, file_path in expected:
+        if not os.path.exists(file_path):
+            continue
+
+        # Prefer the access timestamp from the journal, else the file mtime
+        entry = journal.state.get((match, market), {}).get("saved")
+        timestamp = entry["timestamp"] if entry else os.path.getmtime(file_path)
+        if entry is None:
+            journal.saved(match, market, file_path, timestamp)
+
+        store.update_cell(db_index, status_col, "done")
+        store.update_cell(db_index, status_col + 1, timestamp)
+        journal.recorded(match, market)
+        n_fixed = n_fixed + 1
+
+    return n_fixed
@@ -0,0 +1,214 @@
+# Importing required libraries
+import os
+import time
+import bisect
+import threading
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# === Live scraping telemetry in Prometheus text format ===
+# Counters, gauges and histograms with labels, served on http://METRICS_HOST:METRICS_PORT/metrics
+# by a daemon thread (standard library only). Point Prometheus (or curl) at every
+# scraper host to watch concurrent sessions and stop a bad one early. Every series
+# carries the host's SCRAPER_ID as a label. Without METRICS_PORT nothing is served
+# and recording still works (it is cheap).
+
+# Wait/load latency buckets in seconds (+Inf is added automatically)
+latency_buckets = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+
+
+# === Helper: label dict -> Prometheus label text ===
+def format_labels(labels):
+    if not labels:
+        return ""
+    parts = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{key}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.n += 1
+
+
+class ScrapeMetrics:
+    def __init__(self, scraper_id="local", rate_window=300):
+        self.base_labels = {"scraper": scraper_id}
+        self.lock = threading.Lock()
+        self.help = {}          # name -> (type, help text)
+        self.values = {}        # (name, labels tuple) -> float (counters and gauges)
+        self.histograms = {}    # (name, labels tuple) -> Histogram
+        self.page_times = deque()
+        self.rate_window = rate_window
+        self.server = None
+
+    def describe(self, name, kind, text):
+        self.help[name] = (kind, text)
+
+    def key(self, name, labels):
+        merged = dict(self.base_labels)
+        merged.update(labels)
+        return name, tuple(sorted(merged.items()))
+
+    # --- Recording ---
+    def inc(self, name, amount=1, **labels):
+        with self.lock:
+            key = self.key(name, labels)
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.values[self.key(name, labels)] = value
+
+    def observe(self, name, value, buckets=latency_buckets, **labels):
+        with self.lock:
+            key = self.key(name, labels)
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    # Replace all series of a gauge at once (e.g. queue depth per competition/market)
+    def set_all(self, name, series):
+        with self.lock:
+            for key in [k for k in self.values if k[0] == name]:
+                del self.values[key]
+            for labels, value in series:
+                self.values[self.key(name, labels)] = value
+
+    # One finished page: counter + rolling pages/minute
+    def page(self, **labels):
+        now = time.time()
+        with self.lock:
+            self.page_times.append(now)
+            while self.page_times and self.page_times[0] < now - self.rate_window:
+                self.page_times.popleft()
+        self.inc("scraper_pages_total", **labels)
+
+    def pages_per_minute(self):
+        now = time.time()
+        with self.lock:
+            recent = [t for t in self.page_times if t >= now - self.rate_window]
+        if not recent:
+            return 0.0
+        # Over the window, or since the first page when the session is younger
+        span = max(min(self.rate_window, now - recent[0]), 60)
+        return len(recent) * 60 / span
+
+    # --- Exposition ---
+    def render(self):
+        self.set("scraper_pages_per_minute", round(self.pages_per_minute(), 3))
+        lines = []
+        with self.lock:
+            names = sorted({k[0] for k in self.values} | {k[0] for k in self.histograms})
+            for name in names:
+                kind, text = self.help.get(name, ("untyped", ""))
+                if text:
+                    lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for (series, labels), value in sorted(self.values.items()):
+                    if series == name:
+                        lines.append(f"{name}{format_labels(dict(labels))} {value}")
+                for (series, labels), hist in sorted(self.histograms.items(), key=lambda item: item[0]):
+                    if series != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + ["+Inf"], hist.counts):
+                        cumulative += count
+                        bucket_labels = dict(labels, le=bound)
+                        lines.append(f"{name}_bucket{format_labels(bucket_labels)} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(dict(labels))} {hist.total}")
+                    lines.append(f"{name}_count{format_labels(dict(labels))} {hist.n}")
+        return "\n".join(lines) + "\n"
+
+    # --- HTTP endpoint ---
+    def serve(self, port, host="127.0.0.1"):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass   # keep the scraper output readable
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f'Metrics on http://{host}:{self.server.server_address[1]}/metrics')
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+# === Helper: pending jobs -> scraper_queue_depth series per (competition, season, market) ===
+def queue_depth_series(jobs, name_fn=str):
+    counts = Counter((name_fn(job.competition), job.season, market)
+                     for job in jobs for market in job.pending)
+    return [({"competition": comp, "season": season, "market": market}, n)
+            for (comp, season, market), n in counts.items()]
+
+
+# === State store wrapper: times every call that talks to the sheet / local file ===
+class TimedStore:
+    timed = ("get_all_values", "update_cell", "get_cell", "append_rows",
+             "set_lease", "try_claim", "delete_rows_bulk", "rewrite")
+
+    def __init__(self, store, metrics):
+        self.store = store
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self.store, name)
+        if name not in self.timed:
+            return attr
+
+        def timed_call(*args, **kwargs):
+            start = time.time()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                self.metrics.observe("scraper_state_store_seconds", time.time() - start, op=name)
+        return timed_call
+
+
+# === Build the shared metrics for one scraper/collector from .env ===
+# METRICS_PORT: serve on this port (unset/0 = do not serve); METRICS_HOST: bind address
+# (127.0.0.1 by default, 0.0.0.0 to let a central Prometheus scrape this host)
+def metrics_from_env(site):
+    metrics = ScrapeMetrics(scraper_id=os.getenv("SCRAPER_ID", "local"))
+    metrics.base_labels["site"] = site
+    metrics.describe("scraper_pages_total", "counter", "Pages captured and handed on for saving")
+    metrics.describe("scraper_pages_per_minute", "gauge", "Pages per minute over the last 5 minutes")
+    metrics.describe("scraper_wait_seconds", "histogram", "Time until the awaited element appeared or timed out")
+    metrics.describe("scraper_block_suspicions", "gauge", "Timeouts in a row (block suspicion count)")
+    metrics.describe("scraper_block_suspicions_total", "counter", "All selector timeouts this session")
+    metrics.describe("scraper_pages_rejected_total", "counter", "Captured pages rejected by the pre-save check")
+    metrics.describe("scraper_queue_depth", "gauge", "Pending matches per competition and market")
+    metrics.describe("scraper_pipeline_queue_depth", "gauge", "Pages waiting in the write/state pipeline")
+    metrics.describe("scraper_state_store_seconds", "histogram", "Latency of state-store calls")
+    metrics.describe("scraper_pace", "gauge", "Current pacing multiplier")
+
+    port = int(os.getenv("METRICS_PORT", "0"))
+    if port:
+        metrics.serve(port, host=os.getenv("METRICS_HOST", "127.0.0.1"))
+    return metrics
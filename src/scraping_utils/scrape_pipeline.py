@@ -0,0 +1,125 @@
+# Importing required libraries
+import time
+import queue
+import threading
+from dom_extract import write_capture
+
+
+# === Pipelined bookkeeping behind the browser ===
+# The browser thread only navigates and captures pages (in memory) and submits them.
+# Two workers behind bounded queues do the rest, in submission order:
+#   writer -> file name hash + atomic write + journal "saved"
+#   state  -> status/timestamp in the state store + journal "recorded" + lease release
+# A full queue blocks submit(), so the browser never runs far ahead of the disk/sheet.
+# depth=0 runs every step inline on the browser thread (old sequential behaviour).
+class ScrapePipeline:
+    def __init__(self, journal, store, leases, path_root_fn, depth=4):
+        self.journal = journal
+        self.store = store
+        self.leases = leases
+        self.path_root_fn = path_root_fn   # (match, market) -> path without extension
+        self.sync = depth <= 0
+
+        self.lock = threading.Lock()
+        self.in_flight = set()             # db_index with work still queued
+        self.stats = {"pages": 0, "errors": 0, "write_seconds": 0.0, "state_seconds": 0.0}
+
+        self.write_q = queue.Queue(maxsize=max(depth, 1))
+        self.state_q = queue.Queue(maxsize=max(depth, 1))
+        self.threads = []
+        if not self.sync:
+            for target in (self.write_worker, self.state_worker):
+                thread = threading.Thread(target=target, daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    # --- Browser side ---
+    def submit(self, db_index, match, market, capture, timestamp, status_col):
+        with self.lock:
+            self.in_flight.add(db_index)
+        item = ("page", db_index, match, market, capture, timestamp, status_col)
+        if self.sync:
+            self.record(self.write(item))
+        else:
+            self.write_q.put(item)
+
+    def release(self, db_index):
+        # Goes through the same queues, so it lands after this match's updates
+        item = ("release", db_index)
+        if self.sync:
+            self.record(item)
+        else:
+            self.write_q.put(item)
+
+    def busy(self, db_index):
+        with self.lock:
+            return db_index in self.in_flight
+
+    # --- Stage 1: hash + write ---
+    def write(self, item):
+        if item[0] != "page":
+            return item
+        _, db_index, match, market, capture, timestamp, status_col = item
+
+        start = time.time()
+        filename = write_capture(self.path_root_fn(match, market), capture)
+        self.journal.saved(match, market, filename, timestamp)
+        self.stats["write_seconds"] += time.time() - start
+        return ("saved", db_index, match, market, timestamp, status_col)
+
+    # --- Stage 2: state store + lease ---
+    def record(self, item):
+        if item[0] == "release":
+            db_index = item[1]
+            # Even when the release fails (e.g. Sheets API error) the row must leave
+            # in_flight, else it is never picked again this session
+            try:
+                self.leases.release(db_index)
+            finally:
+                with self.lock:
+                    self.in_flight.discard(db_index)
+            return
+        _, db_index, match, market, timestamp, status_col = item
+
+        start = time.time()
+        self.store.update_cell(db_index, status_col, "done")
+        self.store.update_cell(db_index, status_col + 1, timestamp)
+        self.journal.recorded(match, market)
+        self.stats["state_seconds"] += time.time() - start
+        self.stats["pages"] += 1
+
+    # --- Worker loops (a failed step is logged; the journal lets reconcile() redo it) ---
+    def write_worker(self):
+        while True:
+            item = self.write_q.get()
+            if item is None:
+                self.state_q.put(None)
+                return
+            try:
+                self.state_q.put(self.write(item))
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f'WARNING! Saving {item[2]} failed: {type(e).__name__}: {e}')
+
+    def state_worker(self):
+        while True:
+            item = self.state_q.get()
+            if item is None:
+                return
+            try:
+                self.record(item)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f'WARNING! State update for row {item[1]} failed: {type(e).__name__}: {e}')
+
+    def queue_depth(self):
+        return self.write_q.qsize() + self.state_q.qsize()
+
+    # --- Drain both queues and stop the workers ---
+    def close(self):
+        if not self.sync:
+            self.write_q.put(None)
+            for thread in self.threads:
+                thread.join()
+        print(f'Pipeline: {self.stats["pages"]} pages recorded, {self.stats["errors"]} errors, '
+              f'{self.stats["write_seconds"]:.1f}s writing, {self.stats["state_seconds"]:.1f}s on state updates')
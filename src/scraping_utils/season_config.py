@@ -0,0 +1,70 @@
+# Importing required libraries
+import os
+import re
+import unicodedata
+
+
+# === Seasons and competitions (shared by collectors, scrapers and extractors) ===
+# SEASONS and COMPETITIONS in .env narrow the run, e.g.
+#   SEASONS=2023/2024,2024/2025
+#   COMPETITIONS=Premier League,Serie A
+default_season = "2024/2025"
+
+competitions = ['Premier League', 'Bundesliga', 'Primera División', 'Ligue 1',
+                'Serie A', 'UEFA Champions League', 'UEFA Europa League']
+
+# OddsPortal URL fragment per competition
+oddsportal_links = {
+    'Premier League':        '/football/england/premier-league',
+    'Bundesliga':            '/football/germany/bundesliga',
+    'Primera División':      '/football/spain/laliga',
+    'Ligue 1':               '/football/france/ligue-1',
+    'Serie A':               '/football/italy/serie-a',
+    'UEFA Champions League': '/football/europe/champions-league',
+    'UEFA Europa League':    '/football/europe/europa-league',
+}
+oddsportal_names = {link: name for name, link in oddsportal_links.items()}
+
+# Status-sheet column holding the season (rows without it belong to default_season)
+opta_season_col = 8         # H, after the lease columns F,G
+oddsportal_season_col = 10  # J, after the lease columns H,I
+
+
+# === Selection from .env ===
+def selected_seasons():
+    value = os.getenv("SEASONS", "")
+    return [s.strip() for s in value.split(",") if s.strip()] or [default_season]
+
+def selected_competitions(available=competitions):
+    value = os.getenv("COMPETITIONS", "")
+    wanted = [c.strip() for c in value.split(",") if c.strip()]
+    return [c for c in available if c in wanted] if wanted else list(available)
+
+
+# === Name forms ===
+def season_slug(season):
+    # "2024/2025" -> "2024-2025" (OddsPortal URLs and partition folders)
+    return season.replace("/", "-")
+
+def competition_name(competition):
+    # OddsPortal rows store the URL fragment; map it back to the display name
+    return oddsportal_names.get(competition, competition)
+
+def slugify(text):
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+# === Partitioned storage: root/season=2024-2025/competition=premier-league ===
+def partition_dir(root, season, competition):
+    return os.path.join(root, f"season={season_slug(season)}",
+                        f"competition={slugify(competition_name(competition))}")
+
+def row_season(row, season_col):
+    if len(row) >= season_col and row[season_col - 1].strip():
+        return row[season_col - 1].strip()
+    return default_season
+
+def season_row(row, season_col, season):
+    # Pad a new sheet row so the season lands in its own column
+    return list(row) + [""] * (season_col - 1 - len(row)) + [season]
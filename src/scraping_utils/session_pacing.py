@@ -0,0 +1,152 @@
+# Importing required libraries
+import os
+import json
+import time
+import random
+from collections import deque
+from statistics import median
+
+
+# === Adaptive session length and pacing ===
+# Watches every wait for a page element (found or timed out, and how long it took)
+# and every error-counter increment over a rolling window, and derives:
+#   pace     -> multiplier on the human delays between requests
+#   cooldown -> back-off after a timeout (was a fixed 8-15 s)
+#   budget   -> matches left in this session (grown while healthy, cut when not)
+# Pace is additive-decrease / multiplicative-increase: x1.5 when the suspicion rate is
+# above target or waits slow down, -0.1 after a healthy page, so it settles just under
+# what the site tolerates. Every decision goes to a JSONL log for offline tuning.
+class PacingController:
+    def __init__(self, log_path, session_size, target_rate=0.05, window=20,
+                 max_pace=4.0, max_session=80, max_suspicions=3, metrics=None):
+        self.session_size = session_size
+        self.target_rate = target_rate
+        self.window = window
+        self.max_pace = max_pace
+        self.max_session = max_session
+        self.max_suspicions = max_suspicions
+
+        self.waits = deque(maxlen=window)     # (found, seconds) per wait
+        self.errors = deque(maxlen=window)    # 1 per non-timeout error (timeouts are in waits), else 0
+        self.baseline = None                  # EWMA of successful wait latency
+        self.pace = 1.0
+        self.consecutive = 0                  # timeouts in a row (old block_suspicions)
+        self.pages = 0
+        self.budget_used = 0                  # matches started against the budget
+        self.start = time.time()
+        self.metrics = metrics                # optional ScrapeMetrics (live telemetry)
+
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        self.log = open(log_path, "a", encoding="utf-8")
+        self.decide("start", session_size=session_size, target_rate=target_rate)
+
+    # --- Signals ---
+    def suspicion_rate(self):
+        if not self.waits:
+            return 0.0
+        timeouts = sum(1 for found, _ in self.waits if not found)
+        # Error-counter increments count half: they are often page problems, not blocks
+        return (timeouts + 0.5 * sum(self.errors)) / len(self.waits)
+
+    def latency_ratio(self):
+        recent = [seconds for found, seconds in self.waits if found][-5:]
+        if self.baseline is None or len(recent) < 3:
+            return 1.0
+        return median(recent) / max(self.baseline, 1e-3)
+
+    def healthy(self):
+        return self.suspicion_rate() <= self.target_rate and self.latency_ratio() < 2.0
+
+    def pages_per_hour(self):
+        return self.pages * 3600 / max(time.time() - self.start, 1)
+
+    # --- Observations ---
+    def observe_wait(self, found, seconds):
+        self.waits.append((found, seconds))
+        if found:
+            self.consecutive = 0
+            self.baseline = seconds if self.baseline is None else 0.9 * self.baseline + 0.1 * seconds
+        else:
+            self.consecutive += 1
+        if not self.healthy():
+            self.pace = min(self.pace * 1.5, self.max_pace)
+            self.decide("slow_down")
+
+        if self.metrics is not None:
+            self.metrics.observe("scraper_wait_seconds", seconds, result="found" if found else "timeout")
+            self.metrics.set("scraper_block_suspicions", self.consecutive)
+            self.metrics.set("scraper_pace", self.pace)
+            if not found:
+                self.metrics.inc("scraper_block_suspicions_total")
+
+    def record_error(self):
+        self.errors.append(1)
+
+    # --- Decisions ---
+    def pause(self, low, high):
+        time.sleep(random.uniform(low, high) * self.pace)
+
+    def cooldown(self):
+        seconds = min(random.uniform(8, 15) * self.pace * 2 ** max(self.consecutive - 1, 0), 300)
+        self.decide("cooldown", seconds=round(seconds, 1))
+        return seconds
+
+    def should_stop(self):
+        # Hard stop as before, plus a sustained suspicion rate far over target
+        reason = None
+        if self.consecutive >= self.max_suspicions:
+            reason = "consecutive_timeouts"
+        elif len(self.waits) == self.window and self.suspicion_rate() > 3 * self.target_rate:
+            reason = "suspicion_rate"
+        if reason is not None:
+            self.decide("stop", reason=reason)
+        return reason is not None
+
+    # After a finished match: returns the matches left in the session
+    def page_done(self, remaining):
+        self.pages += 1
+        self.budget_used += 1
+        self.errors.append(0)
+        remaining = remaining - 1
+        if self.healthy():
+            self.pace = max(1.0, self.pace - 0.1)
+            # Extend a healthy session by one match, up to max_session in total
+            if remaining == 0 and self.budget_used < self.max_session and len(self.waits) >= 5:
+                remaining = 1
+                self.decide("extend")
+        elif len(self.waits) == self.window and self.suspicion_rate() > 2 * self.target_rate:
+            # End the session early; a fresh one later beats pushing through
+            remaining = 0
+            self.decide("cut_session")
+        return remaining
+
+    # --- Decision log ---
+    def decide(self, decision, **fields):
+        entry = {"ts": time.time(), "decision": decision, "pace": round(self.pace, 2),
+                 "suspicion_rate": round(self.suspicion_rate(), 3),
+                 "latency_ratio": round(self.latency_ratio(), 2),
+                 "consecutive": self.consecutive, "pages": self.pages,
+                 "pages_per_hour": round(self.pages_per_hour(), 1)}
+        entry.update(fields)
+        self.log.write(json.dumps(entry) + "\n")
+        self.log.flush()
+
+    def close(self):
+        self.decide("end")
+        self.log.close()
+        print(f'Pacing: {self.pages} pages at {self.pages_per_hour():.0f}/hour, '
+              f'suspicion rate {self.suspicion_rate():.2f}, final pace x{self.pace:.2f}')
+
+
+# === Build a controller from .env ===
+# PACING_TARGET: tolerated share of suspicious waits; PACING_WINDOW: waits looked at;
+# SESSION_MAX: matches a session may grow to. The start size stays random 20-40.
+def pacing_from_env(log_path, metrics=None):
+    return PacingController(
+        log_path,
+        session_size=random.choice(range(20, 41)),
+        target_rate=float(os.getenv("PACING_TARGET", "0.05")),
+        window=int(os.getenv("PACING_WINDOW", "20")),
+        max_session=int(os.getenv("SESSION_MAX", "80")),
+        metrics=metrics,
+    )
@@ -0,0 +1,235 @@
+# Importing required libraries
+import os
+import csv
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl   # POSIX only; the local backend falls back to no cross-process lock
+except ImportError:
+    fcntl = None
+
+
+# === Helper: merge 1-based row indices into contiguous (start, end) ranges ===
+def contiguous_ranges(row_indices):
+    ranges = []
+    for idx in sorted(set(row_indices)):
+        if ranges and idx == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], idx)
+        else:
+            ranges.append((idx, idx))
+    return ranges
+
+
+# === Helper: column number -> A1 letter (1 -> A, 27 -> AA) ===
+def col_letter(col_index):
+    letters = ""
+    while col_index > 0:
+        col_index, rem = divmod(col_index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+# === Helper: is a lease (owner, until) free for `owner` at time `now`? ===
+def lease_is_free(current_owner, current_until, owner, now):
+    if current_owner in (None, "") or current_owner == owner:
+        return True
+    try:
+        return float(current_until) < now
+    except (TypeError, ValueError):
+        return True
+
+
+# === Backend: Google Sheet worksheet (gspread) ===
+class SheetStateStore:
+    def __init__(self, ws):
+        self.ws = ws
+
+    def get_all_values(self):
+        return self.ws.get_all_values()
+
+    def append_rows(self, rows):
+        if rows:
+            self.ws.append_rows(rows, value_input_option="RAW")
+
+    def update_cell(self, row_index, col_index, value):
+        self.ws.update_cell(row_index, col_index, value)
+
+    def get_cell(self, row_index, col_index):
+        return self.ws.cell(row_index, col_index).value
+
+    def set_lease(self, row_index, owner_col, owner, until):
+        cells = f"{col_letter(owner_col)}{row_index}:{col_letter(owner_col + 1)}{row_index}"
+        self.ws.update([[owner, until]], cells, value_input_option="RAW")
+
+    def try_claim(self, row_index, owner_col, owner, now, lease_seconds):
+        # The Sheets API has no compare-and-set: read, write our lease, wait a
+        # moment and read back. A concurrent claimer overwrites us and we lose.
+        cells = f"{col_letter(owner_col)}{row_index}:{col_letter(owner_col + 1)}{row_index}"
+        current = (self.ws.get(cells) or [[]])[0] + ["", ""]
+        if not lease_is_free(current[0], current[1], owner, now):
+            return False
+
+        self.set_lease(row_index, owner_col, owner, now + lease_seconds)
+        time.sleep(random.uniform(0.5, 1.5))
+        check = (self.ws.get(cells) or [[]])[0] + [""]
+        return check[0] == owner
+
+    def delete_rows_bulk(self, row_indices):
+        # One batchUpdate with a deleteDimension request per contiguous range.
+        # Ranges are sent bottom-to-top so earlier deletes do not shift later ones.
+        ranges = contiguous_ranges(row_indices)
+        requests = []
+        for start, end in reversed(ranges):
+            requests.append({
+                "deleteDimension": {
+                    "range": {
+                        "sheetId": self.ws.id,
+                        "dimension": "ROWS",
+                        "startIndex": start - 1,   # 0-based, inclusive
+                        "endIndex": end            # 0-based, exclusive
+                    }
+                }
+            })
+        if requests:
+            self.ws.spreadsheet.batch_update({"requests": requests})
+        return ranges
+
+    def rewrite(self, rows):
+        # Write the new content first, then clear only what is left below it, so a
+        # failed call never leaves an empty sheet. Rows are padded with "" to the
+        # grid width to blank old cells on their right. USER_ENTERED parses numbers
+        # (timestamps, error counts) the way they were typed in originally.
+        width = max([self.ws.col_count] + [len(row) for row in rows])
+        padded = [list(row) + [""] * (width - len(row)) for row in rows]
+        if padded:
+            self.ws.update(padded, "A1", value_input_option="USER_ENTERED")
+        self.ws.batch_clear([f"A{len(rows) + 1}:{col_letter(width)}"])
+
+
+# === Backend: local CSV file (stand-in for the Google Sheet) ===
+class LocalStateStore:
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()   # lock depth per thread
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not os.path.exists(path):
+            open(path, "w", encoding="utf-8").close()
+
+    def get_all_values(self):
+        with open(self.path, newline="", encoding="utf-8") as f:
+            rows = [row for row in csv.reader(f)]
+        # Pad ragged rows to the widest one, as gspread does for the sheet
+        width = max((len(row) for row in rows), default=0)
+        return [row + [""] * (width - len(row)) for row in rows]
+
+    def append_rows(self, rows):
+        if rows:
+            with self.locked(), open(self.path, "a", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+
+    def update_cell(self, row_index, col_index, value):
+        with self.locked():
+            rows = self.get_all_values()
+            while len(rows) < row_index:
+                rows.append([])
+            row = rows[row_index - 1]
+            while len(row) < col_index:
+                row.append("")
+            row[col_index - 1] = str(value)
+            self.rewrite(rows)
+
+    def get_cell(self, row_index, col_index):
+        rows = self.get_all_values()
+        if row_index <= len(rows) and col_index <= len(rows[row_index - 1]):
+            return rows[row_index - 1][col_index - 1]
+        return None
+
+    @contextmanager
+    def locked(self):
+        # Exclusive lock across processes and threads (re-entrant within one thread)
+        depth = getattr(self.local, "depth", 0)
+        if depth > 0:
+            self.local.depth = depth + 1
+            try:
+                yield
+            finally:
+                self.local.depth = depth
+            return
+
+        with open(self.path + ".lock", "w") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            self.local.depth = 1
+            try:
+                yield
+            finally:
+                self.local.depth = 0
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def set_lease(self, row_index, owner_col, owner, until):
+        with self.locked():
+            self.update_cell(row_index, owner_col, owner)
+            self.update_cell(row_index, owner_col + 1, until)
+
+    def try_claim(self, row_index, owner_col, owner, now, lease_seconds):
+        # Read-check-write under the file lock, so the claim is atomic
+        with self.locked():
+            current_owner = self.get_cell(row_index, owner_col)
+            current_until = self.get_cell(row_index, owner_col + 1)
+            if not lease_is_free(current_owner, current_until, owner, now):
+                return False
+            self.update_cell(row_index, owner_col, owner)
+            self.update_cell(row_index, owner_col + 1, now + lease_seconds)
+            return True
+
+    def delete_rows_bulk(self, row_indices):
+        ranges = contiguous_ranges(row_indices)
+        to_delete = set(row_indices)
+        with self.locked():
+            rows = self.get_all_values()
+            self.rewrite([row for i, row in enumerate(rows, start=1) if i not in to_delete])
+        return ranges
+
+    def rewrite(self, rows):
+        # Write to a temporary file first so a crash never leaves half a file
+        with self.locked():
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                csv.writer(f).writerows(rows)
+            os.replace(tmp_path, self.path)
+
+
+# === Factory: pick a backend by name ===
+def open_state_store(backend, sh=None, worksheet_index=0, local_dir="../../data/state_store"):
+    if backend == "sheet":
+        return SheetStateStore(sh.get_worksheet(worksheet_index))
+    if backend == "local":
+        return LocalStateStore(os.path.join(local_dir, f"worksheet_{worksheet_index}.csv"))
+    raise ValueError(f"Unknown state store backend: {backend}")
+
+
+# === Bulk prune: delete every data row whose first column is in `ids` ===
+def prune_rows(store, ids, dry_run=False, mode="batch"):
+    rows = store.get_all_values()
+    ids = set(ids)
+
+    # Data rows start at sheet row 2 (row 1 is the header)
+    rows_to_delete = [i for i, row in enumerate(rows[1:], start=2) if row and row[0] in ids]
+    ranges = contiguous_ranges(rows_to_delete)
+
+    # Dry-run diff: what would be removed, nothing is written
+    diff = [("-", i, rows[i - 1]) for i in rows_to_delete]
+    if dry_run or not rows_to_delete:
+        return diff, ranges
+
+    if mode == "rewrite":
+        to_delete = set(rows_to_delete)
+        store.rewrite([row for i, row in enumerate(rows, start=1) if i not in to_delete])
+    else:
+        store.delete_rows_bulk(rows_to_delete)
+
+    return diff, ranges
@@ -0,0 +1,102 @@
+# Importing required libraries
+import time
+import random
+import threading
+from state_store import lease_is_free
+
+
+# === Lease-based work claiming across scraper machines ===
+# Every row carries two lease columns next to its status columns:
+#   owner_col     -> SCRAPER_ID of the machine working on it
+#   owner_col + 1 -> epoch until which the lease is valid
+# Expired leases count as free again, so a crashed machine's rows go back to pending.
+class LeaseManager:
+    def __init__(self, store, scraper_id, owner_col, lease_seconds=300):
+        self.store = store
+        self.scraper_id = scraper_id
+        self.owner_col = owner_col
+        self.lease_seconds = lease_seconds
+        self.held = set()
+        self.lock = threading.Lock()
+        self.header_checked = False
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    # --- Which rows can we try? (row = full sheet row, 0-based list) ---
+    def is_available(self, row, now=None):
+        now = time.time() if now is None else now
+        owner = row[self.owner_col - 1] if len(row) >= self.owner_col else ""
+        until = row[self.owner_col] if len(row) > self.owner_col else ""
+        return lease_is_free(owner, until, self.scraper_id, now)
+
+    # --- Name the two lease columns in the header row (once, on first use) ---
+    def ensure_header(self):
+        if self.header_checked:
+            return
+        for col, name in ((self.owner_col, "lease_owner"), (self.owner_col + 1, "lease_until")):
+            if self.store.get_cell(1, col) in (None, ""):
+                self.store.update_cell(1, col, name)
+        self.header_checked = True
+
+    # --- Claim one of the candidates (list of (db_index, ...) tuples) ---
+    # shuffle=False keeps the caller's order (e.g. ranked by MatchScheduler)
+    def claim(self, candidates, max_tries=5, shuffle=True):
+        self.ensure_header()
+        candidates = list(candidates)
+        if shuffle:
+            random.shuffle(candidates)
+        for candidate in candidates[:max_tries]:
+            db_index = candidate[0]
+            if self.store.try_claim(db_index, self.owner_col, self.scraper_id,
+                                    time.time(), self.lease_seconds):
+                with self.lock:
+                    self.held.add(db_index)
+                return candidate
+            print(f'Row {db_index} was claimed by another scraper, trying the next one...')
+        return None
+
+    # --- Give the row back (done, failed or session stops) ---
+    def release(self, db_index):
+        with self.lock:
+            self.held.discard(db_index)
+        self.store.set_lease(db_index, self.owner_col, "", "")
+
+    def release_all(self):
+        with self.lock:
+            held = list(self.held)
+        for db_index in held:
+            self.release(db_index)
+
+    # --- Heartbeat: extend all held leases while the work is running ---
+    # Renewals run outside the lock so a slow sheet does not block claim/release.
+    # A row released while it was being renewed gets its lease cleared again.
+    def heartbeat(self):
+        with self.lock:
+            held = list(self.held)
+        until = time.time() + self.lease_seconds
+        for db_index in held:
+            with self.lock:
+                if db_index not in self.held:
+                    continue
+            self.store.set_lease(db_index, self.owner_col, self.scraper_id, until)
+            with self.lock:
+                released = db_index not in self.held
+            if released:
+                self.store.set_lease(db_index, self.owner_col, "", "")
+
+    def start_heartbeat(self):
+        def run():
+            while not self.stop_event.wait(self.lease_seconds / 3):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    print(f'WARNING! Lease heartbeat failed: {type(e).__name__}')
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+        self.release_all()
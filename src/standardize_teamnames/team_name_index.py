@@ -0,0 +1,277 @@
+# Importing required libraries
+import os
+import re
+import sys
+import csv
+import unicodedata
+from collections import Counter, defaultdict
+
+# Kickoff parsing is shared with the extractors in src/local_scraper
+sys.path.append('../local_scraper')
+from kickoff import normalise_kickoff
+
+
+# === Fuzzy team-name resolution (Opta name -> OddsPortal name) ===
+# build_lookup_from_seed() in standardize_teamnames.R only reaches teams connected to
+# the PSG seed through fixtures with exactly the same (competition, kickoff). This
+# script proposes an OddsPortal name for every Opta team from three kinds of evidence:
+#   - token normalisation  -> "1. FC Köln" and "FC Koln" both become "koln"
+#   - trigram index        -> candidates sharing character trigrams, scored by Dice
+#                             similarity; only the query's posting lists are read
+#   - co-occurrence        -> the candidate played in the same competition within a
+#                             day of the Opta fixture, ideally against the aliased opponent
+# Accepted pairs are persisted in data/team_aliases.csv, which the R script reads.
+# Rows with source "manual" are never changed, so wrong proposals can be fixed by hand.
+
+opta_path = "../../data/opta/opta_merged.csv"
+odds_path = "../../data/oddsportal/oddsportal_merged.csv"
+alias_path = "../../data/team_aliases.csv"
+
+# Timezone the raw kickoff strings were shown in (same settings as the extractors)
+opta_tz = os.getenv("OPTA_TZ", "Europe/Amsterdam")
+odds_tz = os.getenv("ODDSPORTAL_TZ", "Europe/Amsterdam")
+
+# Proposals at or above this confidence are accepted (used by the R script)
+min_confidence = float(os.getenv("ALIAS_MIN_CONFIDENCE", "0.6"))
+
+# Same starting pair as the seed-walk in standardize_teamnames.R
+seed_pairs = [("Paris Saint-Germain FC", "PSG")]
+
+alias_header = ["opta_name", "odds_name", "confidence", "name_score", "fixture_score",
+                "accepted", "source"]
+
+# Tokens that say nothing about which club it is
+stop_tokens = {"fc", "cf", "ac", "as", "sc", "afc", "ssc", "sv", "vfb", "vfl", "tsg", "rc",
+               "ogc", "ud", "cd", "rcd", "sd", "ca", "fk", "sk", "bk", "if", "club",
+               "de", "del", "la", "le", "the", "calcio", "football", "futbol", "1", "04", "05"}
+
+# Short forms on either site
+token_aliases = {"utd": "united", "st": "saint", "man": "manchester", "psg": "paris saint germain",
+                 "nott'm": "nottingham", "nottm": "nottingham", "wolves": "wolverhampton",
+                 "spurs": "tottenham", "inter": "internazionale", "gladbach": "monchengladbach"}
+
+
+# === Helper: same competition labels as normalize_comp() in the R script ===
+def normalize_comp(name):
+    for pattern, label in [("Premier League", "Premier League"), ("Bundesliga", "Bundesliga"),
+                           ("Serie A", "Serie A"), ("La.?Liga|Primera Div", "La Liga"),
+                           ("Ligue 1", "Ligue 1"), ("Champions League", "Champions League"),
+                           ("Europa League", "Europa League")]:
+        if re.search(pattern, name):
+            return label
+    return name
+
+
+# === Token normalisation ===
+def name_tokens(name):
+    text = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode().lower()
+    tokens = []
+    for token in re.findall(r"[a-z0-9']+", text):
+        for part in token_aliases.get(token, token).split():
+            if part not in stop_tokens:
+                tokens.append(part)
+    # A name made only of stop tokens keeps its raw tokens
+    return tokens or re.findall(r"[a-z0-9]+", text)
+
+def normalize_name(name):
+    return " ".join(name_tokens(name))
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def dice(a, b):
+    a, b = trigrams(normalize_name(a)), trigrams(normalize_name(b))
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+# === Character-trigram inverted index over the OddsPortal names ===
+class TrigramIndex:
+    def __init__(self, names):
+        self.names = list(names)
+        self.norm = [normalize_name(n) for n in self.names]
+        self.grams = [trigrams(n) for n in self.norm]
+        self.postings = defaultdict(list)
+        for i, grams in enumerate(self.grams):
+            for gram in grams:
+                self.postings[gram].append(i)
+        self.by_norm = defaultdict(list)
+        for i, norm in enumerate(self.norm):
+            self.by_norm[norm].append(i)
+
+    # Top-k names by Dice similarity of the trigram sets, best first
+    def query(self, name, k=10):
+        norm = normalize_name(name)
+        grams = trigrams(norm)
+        shared = Counter()
+        for gram in grams:
+            for i in self.postings.get(gram, ()):
+                shared[i] += 1
+        scored = [(2 * n / (len(grams) + len(self.grams[i])), i) for i, n in shared.items()]
+        # Identical normalised names are certain whatever the trigrams say
+        scored += [(1.0, i) for i in self.by_norm.get(norm, ())]
+        best = {}
+        for score, i in scored:
+            best[i] = max(score, best.get(i, 0))
+        ranked = sorted(best.items(), key=lambda pair: pair[1], reverse=True)
+        return [(self.names[i], score) for i, score in ranked[:k]]
+
+
+# === Fixtures per team, bucketed by (competition, day) for co-occurrence lookups ===
+# rows: (home, away, competition, kickoff epoch or None)
+class FixtureIndex:
+    def __init__(self, rows):
+        self.by_team = defaultdict(list)       # team -> [(comp, day, opponent)]
+        self.by_bucket = defaultdict(list)     # (comp, day) -> [(home, away)]
+        seen = set()
+        for home, away, comp, epoch in rows:
+            if epoch is None or (home, away, comp, epoch) in seen:
+                continue
+            seen.add((home, away, comp, epoch))
+            day = int(epoch // 86400)
+            comp = normalize_comp(comp)
+            self.by_team[home].append((comp, day, away))
+            self.by_team[away].append((comp, day, home))
+            self.by_bucket[(comp, day)].append((home, away))
+
+    # Teams playing in comp within a day of `day`, with their opponent
+    def nearby(self, comp, day):
+        for d in (day - 1, day, day + 1):
+            for home, away in self.by_bucket.get((comp, d), ()):
+                yield home, away
+                yield away, home
+
+
+# === Helper: read (home, away, competition, kickoff epoch) rows from a merged CSV ===
+# Uses KickoffEpoch when the extractor wrote it, else parses the raw kickoff column
+# (KickoffTimeRaw for Opta, KickoffRaw for OddsPortal, as dmy_hm() does in R)
+def read_fixtures(path, raw_col, source_tz):
+    rows = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                epoch = float(row.get("KickoffEpoch") or "")
+            except ValueError:
+                _, epoch = normalise_kickoff(row.get(raw_col) or "", source_tz)
+                epoch = None if epoch == "NA" else float(epoch)
+            rows.append((row["HomeTeam"], row["AwayTeam"], row["Competition"], epoch))
+    return rows
+
+
+# === Helper: persisted alias table ===
+def load_aliases(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+def save_aliases(path, rows):
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=alias_header)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+# === Co-occurrence score of (Opta team, OddsPortal candidate) ===
+# Per Opta fixture: 1 if the candidate played the aliased opponent within a day in the
+# same competition, 0.5 if it played anyone there, else 0. Averaged over the fixtures.
+def fixture_score(opta_team, candidate, opta_fixtures, odds_fixtures, known):
+    fixtures = opta_fixtures.by_team.get(opta_team, [])
+    if not fixtures:
+        return 0.0
+    total = 0.0
+    for comp, day, opp_opta in fixtures:
+        best = 0.0
+        for team, opponent in odds_fixtures.nearby(comp, day):
+            if team != candidate:
+                continue
+            best = max(best, 1.0 if known.get(opp_opta) == opponent else 0.5)
+        total += best
+    return total / len(fixtures)
+
+
+# === Candidates of one Opta team: trigram neighbours + opponents of aliased teams ===
+def candidates(opta_team, name_index, opta_fixtures, odds_fixtures, known, max_fixtures=5):
+    found = dict(name_index.query(opta_team))
+    # Isolated/oddly named teams: whoever faced our opponent's alias around that day
+    for comp, day, opp_opta in opta_fixtures.by_team.get(opta_team, [])[:max_fixtures]:
+        opp_odds = known.get(opp_opta)
+        if opp_odds is None:
+            continue
+        for team, opponent in odds_fixtures.nearby(comp, day):
+            if opponent == opp_odds and team not in found:
+                found[team] = 0.0
+    return found
+
+
+# === Score, then accept one-to-one in order of confidence ===
+def resolve(opta_teams, odds_teams, opta_fixtures, odds_fixtures, known):
+    name_index = TrigramIndex(odds_teams)
+    proposals = []
+    for opta_team in opta_teams:
+        if opta_team in known:
+            continue
+        best = None
+        for candidate, name_sim in candidates(opta_team, name_index, opta_fixtures,
+                                              odds_fixtures, known).items():
+            if not name_sim:
+                name_sim = dice(opta_team, candidate)
+            fix = fixture_score(opta_team, candidate, opta_fixtures, odds_fixtures, known)
+            # Equal weights, so a name match without fixture evidence caps at 0.5
+            confidence = 0.5 * name_sim + 0.5 * fix
+            if name_sim == 1.0 and fix > 0:
+                confidence = max(confidence, 0.9)
+            if best is None or confidence > best[0]:
+                best = (confidence, candidate, name_sim, fix)
+        if best is not None:
+            proposals.append((opta_team,) + best)
+
+    # An OddsPortal name can belong to one Opta team only
+    used = set(known.values())
+    accepted = []
+    for opta_team, confidence, candidate, name_sim, fix in sorted(proposals, key=lambda p: p[1], reverse=True):
+        ok = confidence >= min_confidence and candidate not in used
+        if ok:
+            used.add(candidate)
+        accepted.append({"opta_name": opta_team, "odds_name": candidate,
+                         "confidence": f"{confidence:.3f}", "name_score": f"{name_sim:.3f}",
+                         "fixture_score": f"{fix:.3f}", "accepted": "TRUE" if ok else "FALSE",
+                         "source": "fuzzy"})
+    return accepted
+
+
+# === Run ===
+opta_rows = read_fixtures(opta_path, "KickoffTimeRaw", opta_tz)
+odds_rows = read_fixtures(odds_path, "KickoffRaw", odds_tz)
+opta_teams = sorted({t for row in opta_rows for t in row[:2]})
+odds_teams = sorted({t for row in odds_rows for t in row[:2]})
+opta_fixtures = FixtureIndex(opta_rows)
+odds_fixtures = FixtureIndex(odds_rows)
+
+# Manual rows and the seed are fixed; earlier fuzzy results are recomputed
+alias_rows = [row for row in load_aliases(alias_path) if row["source"] == "manual"]
+for opta_name, odds_name in seed_pairs:
+    if not any(row["opta_name"] == opta_name for row in alias_rows):
+        alias_rows.append({"opta_name": opta_name, "odds_name": odds_name, "confidence": "1.000",
+                           "name_score": "", "fixture_score": "", "accepted": "TRUE", "source": "seed"})
+known = {row["opta_name"]: row["odds_name"] for row in alias_rows if row["accepted"] == "TRUE"}
+
+# Every accepted alias is new opponent evidence, so resolve in rounds until nothing changes
+proposals = []
+for round_no in range(5):
+    proposals = resolve(opta_teams, odds_teams, opta_fixtures, odds_fixtures, known)
+    new = {p["opta_name"]: p["odds_name"] for p in proposals if p["accepted"] == "TRUE"}
+    print(f"Round {round_no + 1}: {len(new)} new aliases")
+    if not new:
+        break
+    known.update(new)
+    alias_rows += [p for p in proposals if p["accepted"] == "TRUE"]
+
+# Keep the rejected proposals of the last round for review
+alias_rows += [p for p in proposals if p["accepted"] == "FALSE"]
+save_aliases(alias_path, alias_rows)
+
+unmapped = [t for t in opta_teams if t not in known]
+print(f"{len(known)} of {len(opta_teams)} Opta teams mapped, {len(unmapped)} left for review in {alias_path}")